@@ -0,0 +1,142 @@
+import asyncio
+import csv
+import io
+import logging
+from collections import OrderedDict
+from datetime import timezone
+import metrics
+from database import connect
+from config import ARCHIVE_MAX_BUFFER, ARCHIVE_SEEN_SIZE, ARCHIVE_MAX_ATTEMPTS
+
+logger = logging.getLogger('archive')
+
+COLUMNS = (
+    'tweet_id', 'twitter_handle', 'author', 'text', 'created_at', 'is_retweet', 'is_reply',
+    'reply_count', 'retweet_count', 'like_count', 'media_urls'
+)
+
+ARCHIVED = metrics.Counter('archive_tweets_total', 'Tweets written to the archive')
+ARCHIVE_DROPPED = metrics.Counter('archive_dropped_total', 'Tweets dropped because the buffer was full or loading kept failing')
+ARCHIVE_FLUSH_SECONDS = metrics.Histogram('archive_flush_seconds', 'Time spent loading a batch into the archive')
+
+def _pg_array(values):
+    """Postgres array literal for a list of strings"""
+    escaped = (value.replace('\\', '\\\\').replace('"', '\\"') for value in values)
+    return '{' + ','.join(f'"{value}"' for value in escaped) + '}'
+
+def _month_start(moment):
+    return moment.astimezone(timezone.utc).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+def _next_month(moment):
+    return moment.replace(year=moment.year + 1, month=1) if moment.month == 12 else moment.replace(month=moment.month + 1)
+
+class TweetArchiver:
+    """Buffer fetched tweets and bulk load them into tweet_archive with COPY.
+
+    add() only appends to an in-memory buffer, so the poll loop never waits
+    on Postgres. flush() runs the COPY on a worker thread with a dedicated
+    connection.
+    """
+
+    def __init__(self, max_buffer=ARCHIVE_MAX_BUFFER):
+        self.max_buffer = max_buffer
+        self.buffer = []
+        self._seen = OrderedDict()
+        self._partitions = set()
+        self._conn = None
+        self._flush_lock = asyncio.Lock()
+
+    def add(self, handle, tweet):
+        key = (handle.lower(), tweet.id)
+        if key in self._seen:
+            return
+        if len(self.buffer) >= self.max_buffer:
+            ARCHIVE_DROPPED.inc()
+            return
+        self._seen[key] = None
+        if len(self._seen) > ARCHIVE_SEEN_SIZE:
+            self._seen.popitem(last=False)
+        # (handle, tweet, failed load attempts)
+        self.buffer.append((handle, tweet, 0))
+
+    async def flush(self):
+        """Load everything buffered so far; safe to call while the poller runs"""
+        async with self._flush_lock:
+            if not self.buffer:
+                return 0
+            rows, self.buffer = self.buffer, []
+            try:
+                with ARCHIVE_FLUSH_SECONDS.time():
+                    await asyncio.to_thread(self._copy_rows, rows)
+                ARCHIVED.inc(len(rows))
+                return len(rows)
+            except Exception as e:
+                logger.error(f"Error archiving {len(rows)} tweets: {str(e)}")
+                if self._conn is not None:
+                    self._conn.close()
+                    self._conn = None
+                # Retry with the next flush, giving up on rows that keep failing
+                retry = []
+                for handle, tweet, attempts in rows:
+                    if attempts + 1 < ARCHIVE_MAX_ATTEMPTS:
+                        retry.append((handle, tweet, attempts + 1))
+                    else:
+                        ARCHIVE_DROPPED.inc()
+                        self._seen.pop((handle.lower(), tweet.id), None)
+                self.buffer = retry + self.buffer
+                return 0
+
+    def _copy_rows(self, rows):
+        if self._conn is None or self._conn.closed:
+            self._conn = connect()
+
+        data = io.StringIO()
+        writer = csv.writer(data)
+        months = set()
+        for handle, tweet, _ in rows:
+            months.add(_month_start(tweet.created_at))
+            writer.writerow((
+                tweet.id,
+                handle,
+                tweet.author or handle,
+                tweet.text,
+                tweet.created_at.isoformat(),
+                tweet.is_retweet,
+                tweet.is_reply,
+                tweet.metrics.reply_count,
+                tweet.metrics.retweet_count,
+                tweet.metrics.like_count,
+                _pg_array([media.url for media in tweet.media])
+            ))
+        data.seek(0)
+
+        with self._conn.cursor() as cur:
+            for month in months - self._partitions:
+                self._create_partition(cur, month)
+            cur.execute("""
+                CREATE TEMP TABLE IF NOT EXISTS tweet_archive_staging
+                (LIKE tweet_archive INCLUDING DEFAULTS) ON COMMIT DELETE ROWS
+            """)
+            cur.copy_expert(
+                f"COPY tweet_archive_staging ({', '.join(COLUMNS)}) FROM STDIN WITH (FORMAT csv, FORCE_NOT_NULL (text))",
+                data
+            )
+            cur.execute(f"""
+                INSERT INTO tweet_archive ({', '.join(COLUMNS)})
+                SELECT {', '.join(COLUMNS)} FROM tweet_archive_staging
+                ON CONFLICT DO NOTHING
+            """)
+        self._conn.commit()
+        self._partitions |= months
+
+    def _create_partition(self, cur, month):
+        name = f"tweet_archive_y{month.year}m{month.month:02d}"
+        cur.execute(f"""
+            CREATE TABLE IF NOT EXISTS {name} PARTITION OF tweet_archive
+            FOR VALUES FROM (%s) TO (%s)
+        """, (month, _next_month(month)))
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
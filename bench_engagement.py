@@ -0,0 +1,71 @@
+import argparse
+import asyncio
+import random
+import time
+from datetime import datetime, timezone
+from engagement import EngagementStore, rollup
+from models import Tweet, Metrics
+
+def make_tweets(handles, tweets_per_handle, now):
+    """Synthetic tweets with ids that look like real snowflakes"""
+    tweets = []
+    for h in range(handles):
+        for t in range(tweets_per_handle):
+            tweet_id = str(1800000000000000000 + h * tweets_per_handle + t)
+            tweets.append((f"user{h:05d}", tweet_id))
+    return tweets
+
+def fill(store, samples, handles, tweets_per_handle, window):
+    """Record `samples` rows spread evenly over the last `window` seconds"""
+    rng = random.Random(0)
+    now = time.time()
+    created_at = datetime.now(timezone.utc)
+    tweets = make_tweets(handles, tweets_per_handle, now)
+    counts = {tweet_id: [0, 0, 0] for _, tweet_id in tweets}
+    started = time.perf_counter()
+    for i in range(samples):
+        handle, tweet_id = tweets[rng.randrange(len(tweets))]
+        current = counts[tweet_id]
+        current[rng.randrange(3)] += rng.randint(1, 5)
+        tweet = Tweet(
+            id=tweet_id,
+            text='',
+            created_at=created_at,
+            metrics=Metrics(reply_count=current[0], retweet_count=current[1], like_count=current[2]),
+        )
+        store.record(handle, tweet, now - window + window * i / samples)
+    return time.perf_counter() - started
+
+def main():
+    parser = argparse.ArgumentParser(description="Time engagement recording and rollups")
+    parser.add_argument('--samples', type=int, default=2_000_000)
+    parser.add_argument('--handles', type=int, default=1000)
+    parser.add_argument('--tweets-per-handle', type=int, default=50)
+    parser.add_argument('--hours', type=float, default=24)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    window = args.hours * 3600
+    store = EngagementStore(retention=window * 2, max_samples=args.samples * 2)
+    store.flushed = args.samples  # Nothing to write to Postgres here
+    seconds = fill(store, args.samples, args.handles, args.tweets_per_handle, window)
+    print(f"Recorded {store.size:,} samples: {seconds / store.size * 1e6:.2f} us/sample")
+
+    snapshot = store.snapshot()
+    some = [f"user{h:05d}" for h in range(0, args.handles, 10)]
+    for label, handles in (("all handles", None), (f"{len(some)} handles", some), ("1 handle", some[:1])):
+        timings = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            result = rollup(snapshot, handles, window, 5, time.time())
+            timings.append(time.perf_counter() - started)
+        print(f"Rollup over {label:12} {min(timings) * 1000:8.1f} ms "
+              f"({result['samples']:,} samples, {result['tweets']:,} tweets)")
+
+    # The poll loop only ever pays for record(); a rollup runs off-loop
+    started = time.perf_counter()
+    asyncio.run(store.rollup(None, window))
+    print(f"store.rollup() via worker thread: {(time.perf_counter() - started) * 1000:.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+import argparse
+import asyncio
+import os
+import re
+import subprocess
+import sys
+import time
+from collections import Counter
+import aiohttp
+from latency import summarize
+
+SERVERS = {
+    'dev': [sys.executable, 'main.py'],
+    'gunicorn': [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'main:app'],
+}
+
+async def discover_paths(session, base_url):
+    """The landing page plus every local asset it references"""
+    async with session.get(base_url + '/', headers={'Accept-Encoding': 'identity'}) as response:
+        html = await response.text()
+    assets = re.findall(r'(?:href|src|srcset)="(/(?:static|assets)/[^" ]+)', html)
+    return ['/'] + list(dict.fromkeys(assets))
+
+async def worker(session, base_url, paths, deadline, results, revalidate):
+    etags = {}
+    i = 0
+    while time.monotonic() < deadline:
+        path = paths[i % len(paths)]
+        i += 1
+        headers = {'Accept-Encoding': 'gzip'}
+        if revalidate and path in etags:
+            headers['If-None-Match'] = etags[path]
+        started = time.perf_counter()
+        try:
+            async with session.get(base_url + path, headers=headers, auto_decompress=False) as response:
+                body = await response.read()
+                if response.headers.get('ETag'):
+                    etags[path] = response.headers['ETag']
+                results.append((path, response.status, time.perf_counter() - started, len(body)))
+        except aiohttp.ClientError:
+            results.append((path, 'error', time.perf_counter() - started, 0))
+
+async def run(base_url, concurrency, seconds, revalidate):
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector, auto_decompress=False) as session:
+        paths = await discover_paths(session, base_url)
+        results = []
+        deadline = time.monotonic() + seconds
+        await asyncio.gather(*(
+            worker(session, base_url, paths, deadline, results, revalidate) for _ in range(concurrency)
+        ))
+    return paths, results
+
+def wait_for_server(base_url, process, timeout=15):
+    import urllib.request
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("Server exited during startup")
+        try:
+            urllib.request.urlopen(base_url + '/', timeout=1)
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError("Server did not start")
+
+def report(label, paths, results, seconds):
+    statuses = Counter(status for _, status, _, _ in results)
+    total_bytes = sum(size for _, _, _, size in results)
+    overall = summarize([elapsed for _, _, elapsed, _ in results])
+    print(f"== {label} ==")
+    print(f"Requests:   {len(results)} ({len(results) / seconds:.0f} req/s) statuses {dict(statuses)}")
+    print(f"Latency:    p50 {overall['p50'] * 1000:.1f}ms, p95 {overall['p95'] * 1000:.1f}ms, p99 {overall['p99'] * 1000:.1f}ms")
+    print(f"Transfer:   {total_bytes / len(results) / 1024:.1f} KiB/request")
+    for path in paths:
+        sizes = [size for p, status, _, size in results if p == path and status == 200]
+        print(f"  {path:60} {max(sizes, default=0) / 1024:8.1f} KiB")
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the landing page and its assets")
+    parser.add_argument('--url', default=None, help="Benchmark an already running server")
+    parser.add_argument('--server', choices=sorted(SERVERS), default='gunicorn', help="Server to start when --url isn't given")
+    parser.add_argument('--port', type=int, default=3100)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--revalidate', action='store_true', help="Send If-None-Match like a returning browser")
+    args = parser.parse_args()
+
+    process = None
+    base_url = args.url
+    if base_url is None:
+        base_url = f"http://127.0.0.1:{args.port}"
+        env = dict(os.environ, PORT=str(args.port))
+        process = subprocess.Popen(SERVERS[args.server], env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        if process:
+            wait_for_server(base_url, process)
+        paths, results = asyncio.run(run(base_url.rstrip('/'), args.concurrency, args.seconds, args.revalidate))
+        report(args.url or args.server, paths, results, args.seconds)
+    finally:
+        if process:
+            process.terminate()
+            process.wait()
+
+if __name__ == "__main__":
+    main()
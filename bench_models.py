@@ -0,0 +1,51 @@
+import sys
+import tracemalloc
+from datetime import datetime, timezone
+from models import Tweet, Media, Metrics
+
+def make_dict_tweet(i, now):
+    """The nested dict shape TwitterClient used to return"""
+    tweet = {
+        'id': str(1800000000000000000 + i),
+        'text': f"Tweet number {i}",
+        'created_at': now,
+        'public_metrics': {'reply_count': i % 7, 'retweet_count': i % 11, 'like_count': i % 13},
+    }
+    if i % 3 == 0:
+        tweet['attachments'] = {'media': [{'url': f"https://nitter.net/pic/{i}.jpg", 'type': 'photo'}]}
+    return tweet
+
+def make_record_tweet(i, now):
+    media = (Media(url=f"https://nitter.net/pic/{i}.jpg"),) if i % 3 == 0 else ()
+    return Tweet(
+        id=str(1800000000000000000 + i),
+        text=f"Tweet number {i}",
+        created_at=now,
+        metrics=Metrics(reply_count=i % 7, retweet_count=i % 11, like_count=i % 13),
+        author='nasa',
+        media=media,
+    )
+
+def measure(factory, count):
+    """Return bytes allocated while buffering `count` tweets"""
+    now = datetime.now(timezone.utc)
+    tracemalloc.start()
+    buffered = [factory(i, now) for i in range(count)]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del buffered
+    return size
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    print(f"Buffering {count:,} tweets")
+
+    dict_bytes = measure(make_dict_tweet, count)
+    record_bytes = measure(make_record_tweet, count)
+
+    print(f"dict tweets:   {dict_bytes / 1024 / 1024:8.1f} MiB ({dict_bytes / count:6.0f} B/tweet)")
+    print(f"record tweets: {record_bytes / 1024 / 1024:8.1f} MiB ({record_bytes / count:6.0f} B/tweet)")
+    print(f"Saved {100 * (1 - record_bytes / dict_bytes):.0f}%")
+
+if __name__ == "__main__":
+    main()
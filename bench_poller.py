@@ -0,0 +1,156 @@
+import argparse
+import asyncio
+import logging
+import time
+from collections import Counter
+from fake_nitter import FakeNitter
+from twitter_client import TwitterClient
+from cogs.twitter_commands import TwitterCommands
+
+class MemoryDatabase:
+    """In-memory stand-in for Database with the calls check_tweets makes"""
+
+    def __init__(self, handles, channels_per_handle=1):
+        self.rows = []
+        channel_id = 1
+        for handle in handles:
+            for _ in range(channels_per_handle):
+                self.rows.append({
+                    'id': channel_id,
+                    'twitter_handle': handle,
+                    'channel_id': channel_id,
+                    'last_tweet_id': None,
+                    'created_at': None
+                })
+                channel_id += 1
+        self._by_key = {(row['twitter_handle'], row['channel_id']): row for row in self.rows}
+
+    def get_tracked_accounts(self):
+        return [dict(row) for row in self.rows]
+
+    def get_filters(self):
+        return []
+
+    def update_last_tweet_id(self, twitter_handle, channel_id, tweet_id):
+        self._by_key[(twitter_handle, channel_id)]['last_tweet_id'] = tweet_id
+
+class FakeChannel:
+    def __init__(self, channel_id, sink):
+        self.id = channel_id
+        self.sink = sink
+
+    async def send(self, embed=None, **kwargs):
+        self.sink.append((self.id, time.time(), embed))
+
+class FakeBot:
+    """Discord sink: channels that record what would have been sent"""
+
+    def __init__(self):
+        self.sent = []
+        self._channels = {}
+
+    def get_channel(self, channel_id):
+        channel = self._channels.get(channel_id)
+        if channel is None:
+            channel = self._channels[channel_id] = FakeChannel(channel_id, self.sent)
+        return channel
+
+    async def wait_until_ready(self):
+        return
+
+async def run_scale(args, handle_count):
+    servers = []
+    runners = []
+    started = time.time()
+    for i in range(args.instances):
+        server = FakeNitter(
+            handles=handle_count,
+            latency=args.latency,
+            jitter=args.jitter,
+            error_rate=args.error_rate,
+            not_modified=not args.no_304,
+            post_interval=args.post_interval,
+            started=started,
+            rate_limit=args.rate_limit
+        )
+        runners.append(await server.start('127.0.0.1', args.port + i))
+        servers.append(server)
+
+    client = TwitterClient(instances=[server.base_url for server in servers])
+    client.rate_limiter.global_rate = args.global_rate
+    client.rate_limiter.capacities = {server.base_url: args.instance_capacity for server in servers}
+    client.rate_limiter.set_instances(client.instances)
+    db = MemoryDatabase(list(servers[0].handles), args.channels_per_handle)
+    bot = FakeBot()
+    cog = TwitterCommands(bot, db=db, twitter=client)
+    cog.check_tweets.cancel()
+    cog.archive_tweets.cancel()
+    cog.discover_instances.cancel()
+    if args.quiet_after is not None:
+        cog.quiet_after = args.quiet_after
+
+    try:
+        # The first cycle only seeds cursors, as it would after /track
+        await cog.check_tweets()
+
+        requests_before = sum(server.requests for server in servers)
+        statuses_before = sum((server.statuses for server in servers), Counter())
+        wall_started = time.perf_counter()
+        cpu_started = time.process_time()
+        cycle_times = []
+        shed = []
+        for _ in range(args.cycles):
+            started = time.perf_counter()
+            await cog.check_tweets()
+            cycle_times.append(time.perf_counter() - started)
+            shed.append(cog.last_shed)
+        wall = time.perf_counter() - wall_started
+        cpu = time.process_time() - cpu_started
+        requests = sum(server.requests for server in servers) - requests_before
+    finally:
+        await client.close()
+        for runner in runners:
+            await runner.cleanup()
+
+    statuses = sum((server.statuses for server in servers), Counter()) - statuses_before
+    latency = cog.latency_tracker.overall()
+
+    def seconds(value):
+        return f"{value:.2f}s" if value is not None else "n/a"
+
+    print(f"\n== {handle_count:,} handles, {args.instances} instance(s), {args.cycles} cycle(s) ==")
+    print(f"Cycle time:     avg {sum(cycle_times) / len(cycle_times):.2f}s, max {max(cycle_times):.2f}s")
+    print(f"Requests:       {requests:,} ({requests / wall:.1f} req/s) statuses {dict(statuses)}")
+    print(f"Shed per cycle: {shed}")
+    print(f"CPU per poll:   {1000 * cpu / (handle_count * args.cycles - sum(shed)):.2f} ms")
+    print(f"Deliveries:     {len(bot.sent):,}")
+    print(f"Latency:        p50 {seconds(latency['p50'])}, p95 {seconds(latency['p95'])}, p99 {seconds(latency['p99'])}")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark TwitterClient and check_tweets against a fake Nitter")
+    parser.add_argument('--handles', type=int, nargs='+', default=[100, 1000, 10000])
+    parser.add_argument('--instances', type=int, default=2)
+    parser.add_argument('--cycles', type=int, default=3)
+    parser.add_argument('--channels-per-handle', type=int, default=1)
+    parser.add_argument('--latency', type=float, default=0.01)
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--no-304', action='store_true')
+    parser.add_argument('--rate-limit', type=float, default=0.0, help="Fake instance requests/s before 429")
+    parser.add_argument('--global-rate', type=float, default=1000.0, help="Client request budget per second")
+    parser.add_argument('--instance-capacity', type=float, default=1000.0, help="Client requests/s per instance")
+    parser.add_argument('--post-interval', type=float, default=30.0)
+    parser.add_argument('--quiet-after', type=float, default=None,
+                        help="Batch handles whose last tweet is older than this (default BATCH_QUIET_AFTER)")
+    parser.add_argument('--port', type=int, default=18081)
+    return parser.parse_args()
+
+async def main():
+    args = parse_args()
+    # The poller logs every fetch at INFO
+    logging.getLogger().setLevel(logging.WARNING)
+    for handle_count in args.handles:
+        await run_scale(args, handle_count)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -2,8 +2,11 @@ import discord
 from discord.ext import commands
 import asyncio
 import logging
-from config import DISCORD_TOKEN, COMMAND_PREFIX
+import signal
+from config import DISCORD_TOKEN, COMMAND_PREFIX, PROFILE_DEFAULT_SECONDS
 from cogs.twitter_commands import TwitterCommands
+from metrics import start_metrics_server
+from profiler import LoopMonitor, profile_loop
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -22,10 +25,23 @@ class TwitterBot(commands.Bot):
             intents=intents,
             description="Twitter monitoring bot for Discord"
         )
+        self.metrics_runner = None
+        self.loop_monitor = LoopMonitor()
+        self.profile_tasks = set()
 
     async def setup_hook(self):
         """Initialize bot and sync commands"""
         try:
+            # Expose poller metrics for scraping
+            self.metrics_runner = await start_metrics_server()
+
+            # Log whatever blocks the event loop, and profile on SIGUSR1
+            self.loop_monitor.start()
+            try:
+                asyncio.get_running_loop().add_signal_handler(signal.SIGUSR1, self.profile_on_signal)
+            except (NotImplementedError, AttributeError):
+                logger.info("Signals not supported here; use /profile to capture a profile")
+
             # Clear existing commands first
             self.tree.clear_commands(guild=None)
             await self.tree.sync()
@@ -46,6 +62,24 @@ class TwitterBot(commands.Bot):
             logger.error(f"Failed to sync commands: {e}", exc_info=True)
             raise
 
+    def profile_on_signal(self):
+        logger.info("Received SIGUSR1")
+        # Keep a reference so the task isn't garbage collected mid-profile
+        task = asyncio.create_task(profile_loop(PROFILE_DEFAULT_SECONDS), name='signal-profile')
+        self.profile_tasks.add(task)
+        task.add_done_callback(self._profile_done)
+
+    def _profile_done(self, task):
+        self.profile_tasks.discard(task)
+        if not task.cancelled() and task.exception():
+            logger.error("Profiling on SIGUSR1 failed", exc_info=task.exception())
+
+    async def close(self):
+        self.loop_monitor.stop()
+        if self.metrics_runner:
+            await self.metrics_runner.cleanup()
+        await super().close()
+
     async def on_ready(self):
         """Called when the bot is ready and connected to Discord"""
         logger.info(f'{self.user} has connected to Discord!')
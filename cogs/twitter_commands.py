@@ -3,25 +3,53 @@ from discord.ext import commands, tasks
 from discord import app_commands
 import asyncio
 from database import Database
-from twitter_client import TwitterClient
+from twitter_client import TwitterClient, snowflake_timestamp
 from utils import create_tweet_embed, format_error_message
-from config import TWEET_CHECK_INTERVAL
+from latency import LatencyTracker
+from scheduler import PollScheduler
+from filters import build_filters, compile_filter_regex
+from archive import TweetArchiver
+from engagement import EngagementStore
+from profiler import profile_loop
+from discovery import InstanceDiscovery
+from config import (
+    TWEET_CHECK_INTERVAL, LATENCY_REPORT_INTERVAL,
+    BATCH_SIZE, BATCH_QUIET_AFTER,
+    BULK_TRACK_LIMIT, BULK_TRACK_MAX_BYTES, BULK_PROGRESS_INTERVAL,
+    ARCHIVE_FLUSH_INTERVAL, STATS_TOP,
+    PROFILE_DEFAULT_SECONDS, PROFILE_MAX_SECONDS,
+    DISCOVERY_INTERVAL
+)
 import logging
 import re
+import time
+import metrics
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger('twitter_commands')
 
 class TwitterCommands(commands.Cog):
-    def __init__(self, bot):
+    def __init__(self, bot, db=None, twitter=None):
         self.bot = bot
-        self.db = Database()
-        self.twitter = TwitterClient()
+        self.db = db or Database()
+        self.twitter = twitter or TwitterClient()
+        self.quiet_after = BATCH_QUIET_AFTER
+        self.scheduler = PollScheduler()
+        self.last_shed = 0
+        # Compiled per-handle filters, rebuilt after a filter command changes them
+        self.handle_filters = None
         self.checking_tweets = False
         self.command_lock = asyncio.Lock()
+        self.latency_tracker = LatencyTracker()
+        self.last_latency_report = time.monotonic()
+        self.archiver = TweetArchiver()
+        self.engagement = EngagementStore()
+        self.discovery = InstanceDiscovery(self.twitter)
         logger.info("TwitterCommands cog initialized")
         self.check_tweets.start()
+        self.archive_tweets.start()
+        self.discover_instances.start()
 
     def _extract_username(self, input_text: str) -> str:
         """Extract username from either a URL or direct input"""
@@ -44,6 +72,17 @@ class TwitterCommands(commands.Cog):
         # If no URL pattern matches, return the cleaned input
         return input_text
 
+    async def _check_owner(self, interaction: discord.Interaction) -> bool:
+        """Whether the user runs this bot; tell them off if not.
+
+        The bot is shared by every guild that invites it, so being a guild
+        admin isn't enough to see the process internals.
+        """
+        if await self.bot.is_owner(interaction.user):
+            return True
+        await interaction.followup.send("❌ Only the bot's owner can use this command.")
+        return False
+
     @app_commands.command()
     @app_commands.describe(twitter_input="Twitter handle (@username) or profile URL")
     async def track(self, interaction: discord.Interaction, twitter_input: str):
@@ -102,7 +141,7 @@ class TwitterCommands(commands.Cog):
                         self.db.update_last_tweet_id(
                             username, 
                             interaction.channel_id,
-                            str(tweets[0]['id'])
+                            str(tweets[0].id)
                         )
                         await interaction.followup.send(
                             f"✅ Successfully tracking @{username} in this channel!\n"
@@ -125,6 +164,103 @@ class TwitterCommands(commands.Cog):
                     "The service might be experiencing issues. Please try again in a few minutes."
                 )
 
+    @app_commands.command()
+    @app_commands.describe(
+        handles="Handles or profile URLs separated by spaces, commas or new lines",
+        file="A text file with one handle or profile URL per line"
+    )
+    async def trackmany(self, interaction: discord.Interaction, handles: str = None,
+                        file: discord.Attachment = None):
+        """Track many Twitter/X accounts in this channel at once"""
+        try:
+            await interaction.response.defer(ephemeral=True)
+
+            text = handles or ''
+            if file:
+                if file.size > BULK_TRACK_MAX_BYTES:
+                    await interaction.followup.send(
+                        f"❌ The file is too large; keep it under {BULK_TRACK_MAX_BYTES // 1024} KB."
+                    )
+                    return
+                text += '\n' + (await file.read()).decode('utf-8', errors='ignore')
+
+            usernames = {}
+            invalid = []
+            for token in re.split(r'[\s,;]+', text):
+                if not token:
+                    continue
+                username = self._extract_username(token)
+                if not re.fullmatch(r'[A-Za-z0-9_]{1,15}', username):
+                    invalid.append(token)
+                    continue
+                usernames.setdefault(username.lower(), username)
+            usernames = list(usernames.values())
+
+            if not usernames:
+                await interaction.followup.send("❌ Please provide at least one valid Twitter username or profile URL.")
+                return
+
+            # Accounts tracked here already need no lookup
+            tracked = {handle.lower() for handle in self.db.get_channel_accounts(interaction.channel_id)}
+            already = sum(username.lower() in tracked for username in usernames)
+            usernames = [username for username in usernames if username.lower() not in tracked]
+            if not usernames:
+                await interaction.followup.send("ℹ️ Every account in the list is already tracked in this channel")
+                return
+            if len(usernames) > BULK_TRACK_LIMIT:
+                await interaction.followup.send(
+                    f"❌ You can import up to {BULK_TRACK_LIMIT} new accounts at a time (got {len(usernames)})."
+                )
+                return
+
+            progress = await interaction.followup.send(
+                f"⏳ Verifying {len(usernames)} accounts...", wait=True
+            )
+            checked = 0
+            last_update = time.monotonic()
+
+            async def verify(username):
+                nonlocal checked, last_update
+                user, tweets = None, []
+                for attempt in range(3):  # Try up to 3 times
+                    user, tweets = await self.twitter.get_user_and_tweets(username)
+                    if user:
+                        break
+                    await asyncio.sleep(1 + attempt)
+                checked += 1
+                if time.monotonic() - last_update >= BULK_PROGRESS_INTERVAL:
+                    last_update = time.monotonic()
+                    await progress.edit(content=f"⏳ Verified {checked}/{len(usernames)} accounts...")
+                return username, user, tweets
+
+            # Lookups run concurrently; the client's rate limiter paces them
+            results = await asyncio.gather(*(verify(username) for username in usernames))
+
+            found = [(username, str(tweets[0].id) if tweets else None)
+                     for username, user, tweets in results if user]
+            missing = [username for username, user, _ in results if not user]
+
+            async with self.command_lock:
+                added = self.db.add_twitter_accounts(found, interaction.channel_id)
+
+            summary = [f"✅ Now tracking {len(added)} new account{'s' if len(added) != 1 else ''} in this channel"]
+            already += len(found) - len(added)
+            if already:
+                summary.append(f"ℹ️ {already} already tracked")
+            if missing:
+                summary.append(f"❌ Could not find: {', '.join('@' + u for u in missing[:20])}"
+                               + (f" and {len(missing) - 20} more" if len(missing) > 20 else ""))
+            if invalid:
+                summary.append(f"⚠️ Skipped {len(invalid)} invalid entr{'ies' if len(invalid) != 1 else 'y'}")
+            await progress.edit(content="\n".join(summary))
+
+        except Exception as e:
+            logger.error(f"Error in trackmany command: {str(e)}", exc_info=True)
+            await interaction.followup.send(
+                "❌ An error occurred while importing accounts.\n"
+                "The service might be experiencing issues. Please try again in a few minutes."
+            )
+
     @app_commands.command()
     async def untrack(self, interaction: discord.Interaction, username: str):
         """Stop tracking a Twitter account in this channel"""
@@ -171,59 +307,522 @@ class TwitterCommands(commands.Cog):
                     "❌ An error occurred. Please try again."
                 )
 
+    @app_commands.command()
+    @app_commands.describe(
+        twitter_input="Tracked Twitter handle (@username) or profile URL",
+        pattern="Keyword (e.g. $SOL or a contract address) or regular expression",
+        mode="Only send tweets that match, or drop tweets that match",
+        regex="Treat the pattern as a regular expression (requires Manage Channels)"
+    )
+    @app_commands.choices(mode=[
+        app_commands.Choice(name="include", value="include"),
+        app_commands.Choice(name="exclude", value="exclude")
+    ])
+    async def filter(self, interaction: discord.Interaction, twitter_input: str, pattern: str,
+                     mode: app_commands.Choice[str], regex: bool = False):
+        """Only send (or skip) tweets from an account that match a keyword"""
+        async with self.command_lock:
+            try:
+                await interaction.response.defer(ephemeral=True)
+                username = self._extract_username(twitter_input)
+                pattern = pattern.strip()
+                if not pattern:
+                    await interaction.followup.send("❌ Please provide a keyword or pattern.")
+                    return
+                if regex:
+                    # Regexes run on every tweet, so only channel managers may add them
+                    permissions = interaction.permissions
+                    if not (permissions.manage_channels or permissions.administrator):
+                        await interaction.followup.send(
+                            "❌ You need the Manage Channels permission to add regular expression filters."
+                        )
+                        return
+                    try:
+                        compile_filter_regex(pattern)
+                    except ValueError as e:
+                        await interaction.followup.send(f"❌ {e}")
+                        return
+
+                if self.db.add_filter(username, interaction.channel_id, mode.value, pattern, regex):
+                    self.handle_filters = None
+                    action = "Only sending" if mode.value == 'include' else "Skipping"
+                    await interaction.followup.send(
+                        f"✅ {action} tweets from @{username} matching `{pattern}` in this channel"
+                    )
+                else:
+                    await interaction.followup.send(
+                        f"❌ @{username} is not being tracked in this channel"
+                    )
+            except Exception as e:
+                logger.error(f"Error in filter command: {str(e)}", exc_info=True)
+                await interaction.followup.send(
+                    "❌ An error occurred. Please try again."
+                )
+
+    @app_commands.command()
+    @app_commands.describe(
+        twitter_input="Tracked Twitter handle (@username) or profile URL",
+        pattern="The keyword or pattern to remove"
+    )
+    async def unfilter(self, interaction: discord.Interaction, twitter_input: str, pattern: str):
+        """Remove a keyword filter from a tracked account"""
+        async with self.command_lock:
+            try:
+                await interaction.response.defer(ephemeral=True)
+                username = self._extract_username(twitter_input)
+
+                if self.db.remove_filter(username, interaction.channel_id, pattern.strip()):
+                    self.handle_filters = None
+                    await interaction.followup.send(
+                        f"✅ Removed filter `{pattern.strip()}` from @{username}"
+                    )
+                else:
+                    await interaction.followup.send(
+                        f"❌ No filter `{pattern.strip()}` on @{username} in this channel"
+                    )
+            except Exception as e:
+                logger.error(f"Error in unfilter command: {str(e)}", exc_info=True)
+                await interaction.followup.send(
+                    "❌ An error occurred. Please try again."
+                )
+
+    @app_commands.command()
+    @app_commands.describe(
+        twitter_input="Tracked Twitter handle (@username) or profile URL",
+        retweets="Skip retweets",
+        replies="Skip replies"
+    )
+    async def exclude(self, interaction: discord.Interaction, twitter_input: str,
+                      retweets: bool = False, replies: bool = False):
+        """Skip retweets and/or replies from a tracked account"""
+        async with self.command_lock:
+            try:
+                await interaction.response.defer(ephemeral=True)
+                username = self._extract_username(twitter_input)
+
+                if self.db.set_exclusions(username, interaction.channel_id, retweets, replies):
+                    self.handle_filters = None
+                    skipped = [name for name, on in (("retweets", retweets), ("replies", replies)) if on]
+                    await interaction.followup.send(
+                        f"✅ @{username}: skipping {' and '.join(skipped)}" if skipped
+                        else f"✅ @{username}: sending retweets and replies"
+                    )
+                else:
+                    await interaction.followup.send(
+                        f"❌ @{username} is not being tracked in this channel"
+                    )
+            except Exception as e:
+                logger.error(f"Error in exclude command: {str(e)}", exc_info=True)
+                await interaction.followup.send(
+                    "❌ An error occurred. Please try again."
+                )
+
+    @app_commands.command()
+    async def filters(self, interaction: discord.Interaction):
+        """List the filters on tracked accounts in this channel"""
+        async with self.command_lock:
+            try:
+                await interaction.response.defer(ephemeral=True)
+                rows = self.db.get_channel_filters(interaction.channel_id)
+
+                by_handle = {}
+                for row in rows:
+                    lines = by_handle.setdefault(row['twitter_handle'], [])
+                    if not lines:
+                        skipped = [name for name in ('retweets', 'replies') if row[f'exclude_{name}']]
+                        if skipped:
+                            lines.append(f"  ◦ skipping {' and '.join(skipped)}")
+                    if row['pattern']:
+                        kind = "regex" if row['is_regex'] else "keyword"
+                        lines.append(f"  ◦ {row['mode']} {kind} `{row['pattern']}`")
+
+                sections = [f"• @{handle}\n" + "\n".join(lines) for handle, lines in by_handle.items() if lines]
+                if not sections:
+                    await interaction.followup.send(
+                        "No filters are set in this channel"
+                    )
+                    return
+
+                await interaction.followup.send(
+                    "🔎 Filters:\n" + "\n".join(sections)
+                )
+            except Exception as e:
+                logger.error(f"Error in filters command: {str(e)}", exc_info=True)
+                await interaction.followup.send(
+                    "❌ An error occurred. Please try again."
+                )
+
+    @app_commands.command()
+    @app_commands.describe(
+        query="Words to search for; supports \"quoted phrases\", OR and -exclusions",
+        username="Only search tweets from this tracked Twitter handle"
+    )
+    async def search(self, interaction: discord.Interaction, query: str, username: str = None):
+        """Search archived tweets from accounts tracked in this channel"""
+        try:
+            await interaction.response.defer(ephemeral=True)
+            # The archive holds every guild's accounts; only search this channel's
+            handles = self.db.get_channel_accounts(interaction.channel_id)
+            if username:
+                username = self._extract_username(username)
+                handles = [handle for handle in handles if handle.lower() == username.lower()]
+                if not handles:
+                    await interaction.followup.send(f"❌ @{username} is not being tracked in this channel")
+                    return
+            elif not handles:
+                await interaction.followup.send("📝 No Twitter accounts are being tracked in this channel.")
+                return
+
+            results = await asyncio.to_thread(self.db.search_tweets, query, handles)
+            if not results:
+                await interaction.followup.send(f"🔍 No archived tweets match `{query}`")
+                return
+
+            lines = [f"🔍 Results for `{query}`:"]
+            for row in results:
+                text = row['text'] if len(row['text']) <= 150 else row['text'][:147] + "..."
+                lines.append(
+                    f"• @{row['twitter_handle']} · {row['created_at']:%Y-%m-%d}: {text}\n"
+                    f"  <https://twitter.com/{row['author']}/status/{row['tweet_id']}>"
+                )
+            await interaction.followup.send("\n".join(lines)[:2000])
+        except Exception as e:
+            logger.error(f"Error in search command: {str(e)}", exc_info=True)
+            await interaction.followup.send(
+                "❌ An error occurred. Please try again."
+            )
+
+    @app_commands.command()
+    @app_commands.describe(
+        username="Only show stats for this Twitter handle",
+        hours="How many hours back to look (default 24)"
+    )
+    async def stats(self, interaction: discord.Interaction, username: str = None,
+                    hours: app_commands.Range[int, 1, 168] = 24):
+        """Show engagement for accounts tracked in this channel"""
+        try:
+            await interaction.response.defer(ephemeral=True)
+            handles = self.db.get_channel_accounts(interaction.channel_id)
+            if username:
+                username = self._extract_username(username)
+                handles = [handle for handle in handles if handle.lower() == username.lower()]
+                if not handles:
+                    await interaction.followup.send(f"❌ @{username} is not being tracked in this channel")
+                    return
+            elif not handles:
+                await interaction.followup.send("📝 No Twitter accounts are being tracked in this channel.")
+                return
+
+            result = await self.engagement.rollup(handles, window=hours * 3600, top=STATS_TOP)
+            if not result['tweets']:
+                await interaction.followup.send(f"📊 No engagement recorded in the last {hours}h")
+                return
+
+            def describe(tweet):
+                return (
+                    f"• @{tweet['twitter_handle']}: ❤️ {tweet['likes']} 🔁 {tweet['retweets']} "
+                    f"💬 {tweet['replies']} ({tweet['velocity']:.0f}/h)\n"
+                    f"  <https://twitter.com/{tweet['twitter_handle']}/status/{tweet['tweet_id']}>"
+                )
+
+            lines = [f"📊 Engagement over the last {hours}h ({result['tweets']} tweets):", "**Top tweets**"]
+            lines.extend(describe(tweet) for tweet in result['top'])
+            lines.append("**Fastest growing**")
+            lines.extend(describe(tweet) for tweet in result['fastest'])
+            if len(result['handles']) > 1:
+                lines.append("**Accounts**")
+                lines.extend(
+                    f"• @{row['twitter_handle']}: {row['per_hour']:.0f} interactions/h over {row['tweets']} tweets"
+                    for row in result['handles'][:STATS_TOP]
+                )
+            await interaction.followup.send("\n".join(lines)[:2000])
+        except Exception as e:
+            logger.error(f"Error in stats command: {str(e)}", exc_info=True)
+            await interaction.followup.send(
+                "❌ An error occurred. Please try again."
+            )
+
+    @app_commands.command()
+    @app_commands.describe(username="Only show latency for this Twitter handle")
+    async def latency(self, interaction: discord.Interaction, username: str = None):
+        """Show tweet-to-notification latency percentiles"""
+        try:
+            await interaction.response.defer(ephemeral=True)
+
+            def describe(stats):
+                if not stats['count']:
+                    return "no deliveries yet"
+                return (
+                    f"p50 {stats['p50']:.1f}s · p95 {stats['p95']:.1f}s · "
+                    f"p99 {stats['p99']:.1f}s ({stats['count']} deliveries)"
+                )
+
+            if username:
+                username = self._extract_username(username)
+                await interaction.followup.send(
+                    f"⏱️ Latency for @{username}: {describe(self.latency_tracker.for_handle(username))}"
+                )
+                return
+
+            lines = [f"⏱️ Overall: {describe(self.latency_tracker.overall())}"]
+            for instance, stats in sorted(self.latency_tracker.by_instance().items()):
+                lines.append(f"• {instance}: {describe(stats)}")
+            await interaction.followup.send("\n".join(lines))
+        except Exception as e:
+            logger.error(f"Error in latency command: {str(e)}", exc_info=True)
+            await interaction.followup.send(
+                "❌ An error occurred. Please try again."
+            )
+
+    @app_commands.command()
+    @app_commands.default_permissions(administrator=True)
+    @app_commands.checks.has_permissions(administrator=True)
+    @app_commands.describe(seconds="How long to sample the bot for")
+    async def profile(self, interaction: discord.Interaction,
+                      seconds: app_commands.Range[int, 1, PROFILE_MAX_SECONDS] = PROFILE_DEFAULT_SECONDS):
+        """Capture a sampling profile of the running bot (bot owner only)"""
+        try:
+            await interaction.response.defer(ephemeral=True)
+            if not await self._check_owner(interaction):
+                return
+            result = await profile_loop(seconds)
+            if result is None:
+                await interaction.followup.send("⏳ A profile is already being captured, try again shortly.")
+                return
+
+            lines = [f"🔬 {result['samples']} samples over {seconds}s written to `{result['path']}`"]
+            for label, share in result['top']:
+                lines.append(f"• {share:5.1%} {label}")
+            await interaction.followup.send(
+                "\n".join(lines)[:2000],
+                file=discord.File(result['path'])
+            )
+        except Exception as e:
+            logger.error(f"Error in profile command: {str(e)}", exc_info=True)
+            await interaction.followup.send(
+                "❌ An error occurred. Please try again."
+            )
+
+    @app_commands.command()
+    @app_commands.default_permissions(administrator=True)
+    @app_commands.checks.has_permissions(administrator=True)
+    async def instances(self, interaction: discord.Interaction):
+        """Show the Nitter instances tweets are fetched from (bot owner only)"""
+        try:
+            await interaction.response.defer(ephemeral=True)
+            if not await self._check_owner(interaction):
+                return
+            rate_limiter = self.twitter.rate_limiter
+            lines = [
+                f"🌐 {len(self.twitter.instances)} Nitter instances, "
+                f"{rate_limiter.total_rate():.1f} requests/s available:"
+            ]
+            for instance in self.twitter.instances:
+                latency = self.discovery.latencies.get(instance)
+                probe = f"{latency * 1000:.0f}ms" if latency is not None else "not probed"
+                state = "paused" if rate_limiter.is_paused(instance) else f"{rate_limiter.buckets[instance].rate:.1f}/s"
+                lines.append(f"• {instance}: {probe}, {state}")
+            await interaction.followup.send("\n".join(lines)[:2000])
+        except Exception as e:
+            logger.error(f"Error in instances command: {str(e)}", exc_info=True)
+            await interaction.followup.send(
+                "❌ An error occurred. Please try again."
+            )
+
     @tasks.loop(seconds=TWEET_CHECK_INTERVAL)
     async def check_tweets(self):
         """Check for new tweets from tracked accounts"""
         if self.checking_tweets:
             return
 
+        cycle_started = time.perf_counter()
+        handles = []
         try:
             self.checking_tweets = True
             accounts = self.db.get_tracked_accounts()
 
+            # Group subscriptions by handle so each feed is fetched and
+            # each new tweet rendered once, then fanned out to every channel
+            subscriptions = {}
             for account in accounts:
+                subscriptions.setdefault(account['twitter_handle'], []).append(account)
+            metrics.TRACKED_HANDLES.set(len(subscriptions))
+            if self.handle_filters is None:
+                self.handle_filters = build_filters(subscriptions, self.db.get_filters())
+
+            # Rank handles and shed the tail if they won't all fit this cycle
+            quiet = {handle for handle, handle_accounts in subscriptions.items() if self._is_quiet(handle_accounts)}
+
+            def cost(handle):
+                return 1 / BATCH_SIZE if handle in quiet else 1
+
+            handles, self.last_shed = self.scheduler.plan(subscriptions, cost, self.twitter.rate_limiter.total_rate())
+            metrics.POLL_SHED.set(self.last_shed)
+
+            position = 0
+            async for handle, tweets in self._fetch_timelines(handles, quiet):
+                position += 1
+                metrics.POLL_QUEUE_DEPTH.set(len(handles) - position)
+                self.scheduler.mark_polled(handle)
+                handle_accounts = subscriptions[handle]
+                # Every entry of the feed, not just the newest, so a tweet keeps being sampled after the next one
+                self.engagement.record_many(handle, self.twitter.pop_engagement(handle))
                 try:
-                    tweets = await self.twitter.get_recent_tweets(account['twitter_handle'])
                     if not tweets:
                         continue
 
-                    channel = self.bot.get_channel(account['channel_id'])
-                    if not channel:
-                        continue
+                    tweet = tweets[0]
+                    self.archiver.add(handle, tweet)
+                    trace = self.latency_tracker.start(tweet)
+                    user = None
+                    handle_filter = self.handle_filters.get(handle)
+                    matched = None
+                    for account in handle_accounts:
+                        try:
+                            channel = self.bot.get_channel(account['channel_id'])
+                            if not channel:
+                                continue
 
-                    last_tweet_id = account['last_tweet_id']
-                    if not last_tweet_id:
-                        latest_id = str(tweets[0]['id'])
-                        self.db.update_last_tweet_id(
-                            account['twitter_handle'],
-                            account['channel_id'],
-                            latest_id
-                        )
-                        continue
+                            last_tweet_id = account['last_tweet_id']
+                            if not last_tweet_id:
+                                self.db.update_last_tweet_id(
+                                    handle,
+                                    account['channel_id'],
+                                    str(tweet.id)
+                                )
+                                continue
 
-                    tweet = tweets[0]
-                    if int(tweet['id']) > int(last_tweet_id):
-                        user = await self.twitter.get_user_by_username(account['twitter_handle'])
-                        if user:
-                            embed = create_tweet_embed(tweet, user)
-                            await channel.send(embed=embed)
-                            self.db.update_last_tweet_id(
-                                account['twitter_handle'],
-                                account['channel_id'],
-                                str(tweet['id'])
-                            )
+                            if int(tweet.id) > int(last_tweet_id):
+                                if 'diffed' not in trace:
+                                    self.latency_tracker.mark(trace, 'diffed')
+                                if handle_filter:
+                                    # Scan the tweet once for every channel's rules
+                                    if matched is None:
+                                        matched = handle_filter.match(tweet)
+                                    if not handle_filter.allows(account['id'], tweet, matched):
+                                        metrics.DELIVERIES.inc(result='filtered')
+                                        self.db.update_last_tweet_id(
+                                            handle,
+                                            account['channel_id'],
+                                            str(tweet.id)
+                                        )
+                                        continue
+                                if user is None:
+                                    # From the feed just fetched, not another request
+                                    user = self.twitter.profile_for(handle)
+                                embed = create_tweet_embed(tweet, user)
+                                channel_trace = self.latency_tracker.mark(dict(trace), 'queued')
+                                with metrics.DELIVERY_SECONDS.time():
+                                    await channel.send(embed=embed)
+                                self.latency_tracker.delivered(channel_trace, handle, tweet.instance, tweet.id)
+                                metrics.DELIVERIES.inc(result='sent')
+                                self.db.update_last_tweet_id(
+                                    handle,
+                                    account['channel_id'],
+                                    str(tweet.id)
+                                )
+                        except Exception as e:
+                            metrics.DELIVERIES.inc(result='failed')
+                            logger.error(f"Error delivering tweet from {handle} to {account['channel_id']}: {str(e)}")
+                            continue
 
                 except Exception as e:
-                    logger.error(f"Error checking tweets for {account['twitter_handle']}: {str(e)}")
+                    logger.error(f"Error checking tweets for {handle}: {str(e)}")
                     continue
 
-                await asyncio.sleep(0.5)
-
         except Exception as e:
             logger.error(f"Error in check_tweets: {str(e)}")
         finally:
+            metrics.POLL_QUEUE_DEPTH.set(0)
+            cycle_seconds = time.perf_counter() - cycle_started
+            metrics.POLL_CYCLE_SECONDS.observe(cycle_seconds)
+            if handles:
+                saturated = self.last_shed > 0 or cycle_seconds > self.scheduler.cycle_target
+                self.scheduler.record_cycle(sum(cost(handle) for handle in handles), cycle_seconds, saturated)
+            if time.monotonic() - self.last_latency_report >= LATENCY_REPORT_INTERVAL:
+                self.latency_tracker.log_report()
+                self.last_latency_report = time.monotonic()
             self.checking_tweets = False
 
+    def _is_quiet(self, handle_accounts) -> bool:
+        """Whether every subscription has a cursor and the handle hasn't tweeted lately"""
+        cursors = [account['last_tweet_id'] for account in handle_accounts]
+        if not all(cursors):
+            return False
+        newest = max(int(cursor) for cursor in cursors)
+        return time.time() - snowflake_timestamp(newest) > self.quiet_after
+
+    async def _fetch_single(self, handle):
+        return [(handle, await self.twitter.get_recent_tweets(handle))]
+
+    async def _fetch_batch(self, chunk):
+        results = await self.twitter.get_recent_tweets_batch(chunk)
+        timelines = []
+        for handle in chunk:
+            if handle in results:
+                timelines.append((handle, results[handle]))
+            else:
+                timelines.append((handle, await self.twitter.get_recent_tweets(handle)))
+        return timelines
+
+    async def _fetch_timelines(self, handles, quiet):
+        """Yield (handle, tweets) for each handle as its feed arrives.
+
+        Requests are started in priority order and run concurrently, paced by
+        the client's semaphore and rate limiter. Quiet handles are packed into
+        combined timeline requests, falling back to a single fetch for any
+        handle the combined page could not account for.
+        """
+        pending = []
+        batched = []
+        for handle in handles:
+            if handle in quiet:
+                batched.append(handle)
+            else:
+                pending.append(asyncio.create_task(self._fetch_single(handle)))
+
+        for i in range(0, len(batched), BATCH_SIZE):
+            chunk = batched[i:i + BATCH_SIZE]
+            if len(chunk) > 1:
+                pending.append(asyncio.create_task(self._fetch_batch(chunk)))
+            else:
+                pending.append(asyncio.create_task(self._fetch_single(chunk[0])))
+
+        try:
+            for next_done in asyncio.as_completed(pending):
+                for handle, tweets in await next_done:
+                    yield handle, tweets
+        finally:
+            for task in pending:
+                task.cancel()
+
     @check_tweets.before_loop
     async def before_check_tweets(self):
-        await self.bot.wait_until_ready()
\ No newline at end of file
+        await self.bot.wait_until_ready()
+
+    @tasks.loop(seconds=ARCHIVE_FLUSH_INTERVAL)
+    async def archive_tweets(self):
+        """Bulk load tweets and engagement samples fetched since the last run"""
+        await self.archiver.flush()
+        await self.engagement.flush()
+
+    @tasks.loop(seconds=DISCOVERY_INTERVAL)
+    async def discover_instances(self):
+        """Probe candidate Nitter instances and refresh the fetch rotation"""
+        try:
+            await self.discovery.refresh()
+        except Exception as e:
+            logger.error(f"Error discovering Nitter instances: {str(e)}", exc_info=True)
+
+    @discover_instances.before_loop
+    async def before_discover_instances(self):
+        await self.bot.wait_until_ready()
+
+    async def cog_unload(self):
+        self.check_tweets.cancel()
+        self.archive_tweets.cancel()
+        self.discover_instances.cancel()
+        await self.archiver.flush()
+        await self.engagement.flush()
+        self.archiver.close()
+        self.engagement.close()
\ No newline at end of file
@@ -33,4 +33,91 @@ NITTER_INSTANCES = [
     "https://nitter.kavin.rocks",
     "https://nitter.unixfox.eu",
     "https://nitter.projectsegfau.lt"
-]
\ No newline at end of file
+]
+
+# Request budget shared across Nitter instances (requests per second)
+GLOBAL_REQUEST_RATE = 10
+DEFAULT_INSTANCE_CAPACITY = 2  # What a single instance tolerates unless overridden
+INSTANCE_CAPACITY = {}  # Per-instance overrides, e.g. {"https://nitter.net": 5}
+RATE_LIMIT_BURST = 2  # Seconds worth of requests an idle instance can save up
+DEFAULT_RETRY_AFTER = 60  # Pause after a 429 without a Retry-After header
+RATE_LIMIT_MAX_WAIT = 30  # Give up on a fetch rather than wait longer for a token
+
+# Rendered tweets kept for fan-out to multiple channels
+RENDER_CACHE_SIZE = 1000
+PROFILE_CACHE_SIZE = 10000  # Profiles remembered from feed headers, one per handle
+VALIDATOR_CACHE_SIZE = 20000  # ETag/Last-Modified of single-user feeds, one per handle and instance
+
+# Prometheus metrics endpoint served by the bot process
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')  # Set to 0.0.0.0 to let a remote Prometheus scrape it
+METRICS_PORT = int(os.getenv('METRICS_PORT', 9100))
+
+# Notification latency tracking (tweet created_at to channel.send)
+LATENCY_WINDOW = 500  # Samples kept per handle/instance for percentiles
+SLOW_DELIVERY_THRESHOLD = 60  # Log a stage breakdown above this many seconds
+LATENCY_REPORT_INTERVAL = 300  # Log p50/p95/p99 every 5 minutes
+
+# Combined timeline fetches for quiet accounts (user1,user2,.../rss)
+BATCH_SIZE = 10  # Handles packed into one combined request
+BATCH_FEED_SIZE = 20  # Entries Nitter returns per timeline page
+BATCH_QUIET_AFTER = 6 * 60 * 60  # Batch handles whose last tweet is older than this
+
+# Poll scheduling when there are more handles than fit in a cycle
+POLL_CYCLE_TARGET = TWEET_CHECK_INTERVAL  # Seconds a cycle should take at most
+TOP_LANE_FRACTION = 0.1  # Highest priority handles eligible for the top lane
+TOP_LANE_BUDGET = 0.5  # Most of a cycle's budget the top lane may use
+STALE_LANE_BUDGET = 0.2  # Budget always spent on the longest-unpolled handles
+ACTIVITY_HALF_LIFE = 60 * 60  # Seconds for a handle's activity score to halve
+ACTIVITY_WEIGHT = 2.0  # Activity boost relative to log2(subscribers + 1)
+
+# Bulk /trackmany imports
+BULK_TRACK_LIMIT = 200  # Handles accepted per import
+BULK_TRACK_MAX_BYTES = 64 * 1024  # Largest import file read; 200 profile URLs fit in a fraction of it
+BULK_PROGRESS_INTERVAL = 2  # Seconds between progress message edits
+
+# Per-channel tweet filters
+FILTER_REGEX_MAX_LENGTH = 100  # Longest regular expression accepted by /filter
+FILTER_REGEX_MAX_REPEATS = 2  # Variable-length quantifiers allowed in one regex
+FILTER_REGEX_TEXT_LIMIT = 280  # Characters of a tweet that regex filters look at
+
+# Tweet archive (bulk COPY into Postgres off the delivery path)
+ARCHIVE_FLUSH_INTERVAL = 10  # Seconds between archive loads
+ARCHIVE_MAX_BUFFER = 50000  # Tweets held in memory before new ones are dropped
+ARCHIVE_SEEN_SIZE = 100000  # Recently archived tweet ids remembered to skip repeats
+ARCHIVE_MAX_ATTEMPTS = 3  # Loads a buffered tweet is tried in before it is dropped
+
+# Engagement time series (columnar samples of reply/retweet/like counts)
+ENGAGEMENT_RETENTION = 7 * 24 * 3600  # Seconds of samples kept in memory for /stats
+ENGAGEMENT_MAX_SAMPLES = 5_000_000  # Hard cap on in-memory samples; oldest are dropped first
+ENGAGEMENT_TRACKED_TWEETS = 100000  # Tweets whose last counts are remembered to skip unchanged samples
+STATS_TOP = 5  # Tweets listed per section of /stats
+
+# Event loop monitoring and profiling
+LOOP_LAG_INTERVAL = 0.25  # Seconds between loop heartbeats
+LOOP_LAG_THRESHOLD = 1.0  # Seconds the loop may stall before the blocking stack is logged
+PROFILE_DIR = os.getenv('PROFILE_DIR', 'profiles')  # Where /profile and SIGUSR1 write profiles
+PROFILE_SAMPLE_INTERVAL = 0.005  # Seconds between stack samples while profiling
+PROFILE_DEFAULT_SECONDS = 30
+PROFILE_MAX_SECONDS = 300
+PROFILE_KEEP = 20  # Newest profiles kept in PROFILE_DIR, older ones are deleted
+
+# Media proxy (served by the Flask app in main.py)
+MEDIA_PUBLIC_URL = os.getenv('MEDIA_PUBLIC_URL', '').rstrip('/')  # Where main.py is reachable; unset keeps raw Nitter URLs
+MEDIA_CACHE_DIR = os.getenv('MEDIA_CACHE_DIR', 'media_cache')
+MEDIA_CACHE_MAX_BYTES = 1024 * 1024 * 1024  # Disk budget before least recently used images are evicted
+MEDIA_MAX_IMAGE_BYTES = 20 * 1024 * 1024  # Larger upstream images are refused
+MEDIA_PREVIEW_WIDTHS = (320, 640, 1280)  # Widths a resized preview may be requested at
+MEDIA_EMBED_WIDTH = 1280  # Preview width used for Discord embeds
+MEDIA_ORIGIN = "https://pbs.twimg.com"  # Tried before the Nitter mirrors
+MEDIA_MAX_AGE = 7 * 24 * 3600  # Cache-Control max-age for proxied images
+
+# Nitter instance discovery
+# Comma separated URLs or file paths listing candidate instances, one per line
+# (or a JSON list / {"hosts": [{"url": ...}]} document)
+NITTER_INSTANCE_SOURCES = [s.strip() for s in os.getenv('NITTER_INSTANCE_SOURCES', 'nitter_instances.txt').split(',') if s.strip()]
+DISCOVERY_INTERVAL = 30 * 60  # Seconds between discovery rounds
+DISCOVERY_PROBE_HANDLE = os.getenv('DISCOVERY_PROBE_HANDLE', 'NASA')  # Busy account whose feed every instance should serve
+DISCOVERY_PROBE_TIMEOUT = 5
+DISCOVERY_CONCURRENCY = 20  # Probes in flight at once
+DISCOVERY_RETIRE_AFTER = 3  # Failed rounds in a row before an instance leaves the rotation
+DISCOVERY_MAX_INSTANCES = 20  # Fastest healthy instances kept in the rotation
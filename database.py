@@ -1,16 +1,30 @@
+import functools
 import psycopg2
-from psycopg2.extras import DictCursor
+from psycopg2.extras import DictCursor, execute_values
 from config import DB_CONFIG
+import metrics
+
+def timed(method):
+    """Count and time a database call"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        metrics.DB_CALLS.inc(method=method.__name__)
+        with metrics.DB_SECONDS.time(method=method.__name__):
+            return method(self, *args, **kwargs)
+    return wrapper
+
+def connect():
+    return psycopg2.connect(
+        dbname=DB_CONFIG['database'],
+        user=DB_CONFIG['user'],
+        password=DB_CONFIG['password'],
+        host=DB_CONFIG['host'],
+        port=DB_CONFIG['port']
+    )
 
 class Database:
     def __init__(self):
-        self.conn = psycopg2.connect(
-            dbname=DB_CONFIG['database'],
-            user=DB_CONFIG['user'],
-            password=DB_CONFIG['password'],
-            host=DB_CONFIG['host'],
-            port=DB_CONFIG['port']
-        )
+        self.conn = connect()
         self.create_tables()
 
     def create_tables(self):
@@ -19,6 +33,7 @@ class Database:
                 cur.execute(f.read())
             self.conn.commit()
 
+    @timed
     def add_twitter_account(self, twitter_handle, channel_id, last_tweet_id=None):
         """Add a Twitter account to track with optional last_tweet_id"""
         with self.conn.cursor() as cur:
@@ -33,6 +48,33 @@ class Database:
             result = cur.fetchone()
             return result[0] if result else None
 
+    @timed
+    def add_twitter_accounts(self, accounts, channel_id):
+        """Track many (twitter_handle, last_tweet_id) pairs in one statement.
+
+        Returns the handles that were newly added; ones already tracked in
+        the channel, in any letter case, are left untouched.
+        """
+        if not accounts:
+            return []
+        with self.conn.cursor() as cur:
+            # The unique key is case-sensitive but handles aren't, so NASA must not duplicate nasa
+            inserted = execute_values(cur, """
+                INSERT INTO tracked_accounts (twitter_handle, channel_id, last_tweet_id)
+                SELECT v.twitter_handle, v.channel_id, v.last_tweet_id
+                FROM (VALUES %s) AS v (twitter_handle, channel_id, last_tweet_id)
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM tracked_accounts a
+                    WHERE a.channel_id = v.channel_id AND lower(a.twitter_handle) = lower(v.twitter_handle)
+                )
+                ON CONFLICT (twitter_handle, channel_id) DO NOTHING
+                RETURNING twitter_handle
+            """, [(handle, channel_id, last_tweet_id) for handle, last_tweet_id in accounts],
+                template='(%s, %s::bigint, %s::bigint)', page_size=len(accounts), fetch=True)
+            self.conn.commit()
+            return [row[0] for row in inserted]
+
+    @timed
     def remove_twitter_account(self, twitter_handle, channel_id):
         with self.conn.cursor() as cur:
             cur.execute("""
@@ -43,14 +85,17 @@ class Database:
             self.conn.commit()
             return cur.fetchone() is not None
 
+    @timed
     def get_tracked_accounts(self):
         with self.conn.cursor(cursor_factory=DictCursor) as cur:
             cur.execute("""
-                SELECT id, twitter_handle, channel_id, last_tweet_id, created_at
+                SELECT id, twitter_handle, channel_id, last_tweet_id, created_at,
+                       exclude_retweets, exclude_replies
                 FROM tracked_accounts
             """)  # Explicitly select all columns
             return [dict(row) for row in cur.fetchall()]  # Convert to dictionary
 
+    @timed
     def get_channel_accounts(self, channel_id):
         with self.conn.cursor(cursor_factory=DictCursor) as cur:
             cur.execute("""
@@ -59,6 +104,7 @@ class Database:
             """, (channel_id,))
             return [row['twitter_handle'] for row in cur.fetchall()]
 
+    @timed
     def update_last_tweet_id(self, twitter_handle, channel_id, tweet_id):
         with self.conn.cursor() as cur:
             cur.execute("""
@@ -68,5 +114,82 @@ class Database:
             """, (tweet_id, twitter_handle, channel_id))
             self.conn.commit()
 
+    @timed
+    def add_filter(self, twitter_handle, channel_id, mode, pattern, is_regex=False):
+        """Add a filter rule to a subscription, returning its id or None if not tracked"""
+        with self.conn.cursor() as cur:
+            cur.execute("""
+                INSERT INTO subscription_filters (tracked_account_id, mode, pattern, is_regex)
+                SELECT id, %s, %s, %s FROM tracked_accounts
+                WHERE twitter_handle = %s AND channel_id = %s
+                ON CONFLICT (tracked_account_id, pattern) DO UPDATE
+                SET mode = EXCLUDED.mode, is_regex = EXCLUDED.is_regex
+                RETURNING id
+            """, (mode, pattern, is_regex, twitter_handle, channel_id))
+            self.conn.commit()
+            result = cur.fetchone()
+            return result[0] if result else None
+
+    @timed
+    def remove_filter(self, twitter_handle, channel_id, pattern):
+        with self.conn.cursor() as cur:
+            cur.execute("""
+                DELETE FROM subscription_filters f
+                USING tracked_accounts a
+                WHERE f.tracked_account_id = a.id
+                  AND a.twitter_handle = %s AND a.channel_id = %s AND f.pattern = %s
+                RETURNING f.id
+            """, (twitter_handle, channel_id, pattern))
+            self.conn.commit()
+            return cur.fetchone() is not None
+
+    @timed
+    def get_filters(self):
+        with self.conn.cursor(cursor_factory=DictCursor) as cur:
+            cur.execute("""
+                SELECT id, tracked_account_id, mode, pattern, is_regex
+                FROM subscription_filters
+            """)
+            return [dict(row) for row in cur.fetchall()]
+
+    @timed
+    def get_channel_filters(self, channel_id):
+        with self.conn.cursor(cursor_factory=DictCursor) as cur:
+            cur.execute("""
+                SELECT a.twitter_handle, a.exclude_retweets, a.exclude_replies, f.mode, f.pattern, f.is_regex
+                FROM tracked_accounts a
+                LEFT JOIN subscription_filters f ON f.tracked_account_id = a.id
+                WHERE a.channel_id = %s
+                ORDER BY a.twitter_handle, f.mode, f.pattern
+            """, (channel_id,))
+            return [dict(row) for row in cur.fetchall()]
+
+    @timed
+    def set_exclusions(self, twitter_handle, channel_id, exclude_retweets, exclude_replies):
+        with self.conn.cursor() as cur:
+            cur.execute("""
+                UPDATE tracked_accounts
+                SET exclude_retweets = %s, exclude_replies = %s
+                WHERE twitter_handle = %s AND channel_id = %s
+                RETURNING id
+            """, (exclude_retweets, exclude_replies, twitter_handle, channel_id))
+            self.conn.commit()
+            return cur.fetchone() is not None
+
+    @timed
+    def search_tweets(self, query, twitter_handles, limit=10):
+        """Full-text search of the archived tweets of twitter_handles, best matches first"""
+        with self.conn.cursor(cursor_factory=DictCursor) as cur:
+            cur.execute("""
+                SELECT tweet_id, twitter_handle, author, text, created_at,
+                       ts_rank(to_tsvector('english', text), q) AS rank
+                FROM tweet_archive, websearch_to_tsquery('english', %s) q
+                WHERE to_tsvector('english', text) @@ q
+                  AND lower(twitter_handle) = ANY(%s)
+                ORDER BY rank DESC, created_at DESC
+                LIMIT %s
+            """, (query, [handle.lower() for handle in twitter_handles], limit))
+            return [dict(row) for row in cur.fetchall()]
+
     def close(self):
         self.conn.close()
\ No newline at end of file
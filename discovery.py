@@ -0,0 +1,157 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Dict, List, Optional
+import aiohttp
+import feedparser
+import metrics
+from config import (
+    NITTER_INSTANCES, NITTER_INSTANCE_SOURCES,
+    DISCOVERY_PROBE_HANDLE, DISCOVERY_PROBE_TIMEOUT, DISCOVERY_CONCURRENCY,
+    DISCOVERY_RETIRE_AFTER, DISCOVERY_MAX_INSTANCES
+)
+
+logger = logging.getLogger('discovery')
+
+ACTIVE_INSTANCES = metrics.Gauge('nitter_active_instances', 'Nitter instances in the fetch rotation')
+PROBE_SECONDS = metrics.Gauge('nitter_probe_seconds', 'Latency of the last successful discovery probe', ('instance',))
+PROBES = metrics.Counter('nitter_probes_total', 'Discovery probes by result', ('result',))
+
+def parse_instance_list(text: str) -> List[str]:
+    """Instance URLs from a plain list, a JSON list, or a {"hosts": [{"url": ...}]} document"""
+    try:
+        data = json.loads(text)
+    except ValueError:
+        data = [line.split('#', 1)[0].strip() for line in text.splitlines()]
+
+    if isinstance(data, dict):
+        data = data.get('hosts') or data.get('instances') or []
+    urls = []
+    for item in data:
+        if isinstance(item, dict):
+            if item.get('healthy') is False:
+                continue
+            item = item.get('url') or ''
+        if not isinstance(item, str) or not item:
+            continue
+        url = item.strip().rstrip('/')
+        if '://' not in url:
+            url = f"https://{url}"
+        urls.append(url)
+    return urls
+
+def _read_file(path: str) -> str:
+    with open(path) as f:
+        return f.read()
+
+def _check_feed(content: str) -> bool:
+    """True if content is an RSS timeline with real status links"""
+    feed = feedparser.parse(content)
+    return bool(feed.entries) and all('/status/' in entry.get('link', '') for entry in feed.entries[:3])
+
+class InstanceDiscovery:
+    """Keep the client's Nitter rotation populated with healthy instances.
+
+    Each round gathers candidates from NITTER_INSTANCE_SOURCES, the
+    configured NITTER_INSTANCES and the current rotation, and probes them
+    all concurrently by fetching a known account's RSS feed. Instances
+    that answer with a valid timeline join the rotation, fastest first.
+    Ones that fail DISCOVERY_RETIRE_AFTER rounds in a row are retired.
+    The rotation is never emptied: if nothing is healthy it is left as is.
+    """
+
+    def __init__(self, client, sources: Optional[List[str]] = None, probe_handle: str = DISCOVERY_PROBE_HANDLE):
+        self.client = client
+        self.sources = list(NITTER_INSTANCE_SOURCES if sources is None else sources)
+        self.probe_handle = probe_handle
+        self.failures = {}
+        self.latencies = {}
+        ACTIVE_INSTANCES.set(len(client.instances))
+
+    async def load_candidates(self, session: aiohttp.ClientSession) -> List[str]:
+        candidates = list(NITTER_INSTANCES) + list(self.client.instances)
+        for source in self.sources:
+            try:
+                if source.startswith(('http://', 'https://')):
+                    async with session.get(source) as response:
+                        response.raise_for_status()
+                        text = await response.text()
+                elif os.path.exists(source):
+                    text = await asyncio.to_thread(_read_file, source)
+                else:
+                    continue
+                candidates.extend(parse_instance_list(text))
+            except Exception as e:
+                logger.warning(f"Could not read instance list from {source}: {str(e)}")
+        # Keep order, drop duplicates
+        return list(dict.fromkeys(candidates))
+
+    async def probe(self, session: aiohttp.ClientSession, instance: str) -> Optional[float]:
+        """Seconds the instance took to serve a valid feed, or None if it didn't"""
+        try:
+            started = time.perf_counter()
+            async with session.get(f"{instance}/{self.probe_handle}/rss", ssl=False) as response:
+                if response.status != 200:
+                    PROBES.inc(result=str(response.status))
+                    return None
+                content = await response.text()
+            latency = time.perf_counter() - started
+            if not await asyncio.to_thread(_check_feed, content):
+                PROBES.inc(result='invalid')
+                return None
+            PROBES.inc(result='ok')
+            return latency
+        except asyncio.TimeoutError:
+            PROBES.inc(result='timeout')
+        except Exception as e:
+            PROBES.inc(result='error')
+            logger.debug(f"Probe of {instance} failed: {str(e)}")
+        return None
+
+    async def refresh(self) -> Dict[str, List[str]]:
+        """Run one discovery round and update the client's rotation"""
+        timeout = aiohttp.ClientTimeout(total=DISCOVERY_PROBE_TIMEOUT)
+        semaphore = asyncio.Semaphore(DISCOVERY_CONCURRENCY)
+        async with aiohttp.ClientSession(timeout=timeout, headers=self.client.headers) as session:
+            candidates = await self.load_candidates(session)
+
+            async def probe(instance):
+                async with semaphore:
+                    return instance, await self.probe(session, instance)
+
+            results = await asyncio.gather(*(probe(instance) for instance in candidates))
+
+        healthy = {}
+        for instance, latency in results:
+            if latency is None:
+                self.failures[instance] = self.failures.get(instance, 0) + 1
+                self.latencies.pop(instance, None)
+            else:
+                self.failures.pop(instance, None)
+                self.latencies[instance] = latency
+                healthy[instance] = latency
+                PROBE_SECONDS.set(round(latency, 3), instance=instance)
+
+        current = self.client.instances
+        rotation = sorted(healthy, key=healthy.get)[:DISCOVERY_MAX_INSTANCES]
+        # Give instances already in use a few rounds before dropping them
+        rotation += [
+            instance for instance in current
+            if instance not in healthy and self.failures.get(instance, 0) < DISCOVERY_RETIRE_AFTER
+        ]
+        if not rotation:
+            logger.warning(f"No healthy Nitter instances among {len(candidates)} candidates, keeping the current rotation")
+            return {'added': [], 'retired': [], 'active': current}
+
+        added = [instance for instance in rotation if instance not in current]
+        retired = [instance for instance in current if instance not in rotation]
+        if added or retired:
+            self.client.set_instances(rotation)
+            logger.info(
+                f"Nitter rotation now {len(rotation)} instances"
+                f" (added {', '.join(added) or 'none'}; retired {', '.join(retired) or 'none'})"
+            )
+        ACTIVE_INSTANCES.set(len(self.client.instances))
+        return {'added': added, 'retired': retired, 'active': list(self.client.instances)}
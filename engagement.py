@@ -0,0 +1,252 @@
+import asyncio
+import io
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+import metrics
+from database import connect
+from models import Metrics
+from config import ENGAGEMENT_RETENTION, ENGAGEMENT_MAX_SAMPLES, ENGAGEMENT_TRACKED_TWEETS
+
+logger = logging.getLogger('engagement')
+
+# Column name -> dtype; every column is one preallocated array
+COLUMNS = {
+    'sampled_at': np.float64,
+    'tweet_id': np.int64,
+    'handle': np.int32,
+    'replies': np.int32,
+    'retweets': np.int32,
+    'likes': np.int32,
+}
+
+# Samples younger than this are too close to their first sighting to give a velocity
+MIN_VELOCITY_SPAN = 300
+
+ENGAGEMENT_SAMPLES = metrics.Gauge('engagement_samples', 'Engagement samples held in memory')
+ENGAGEMENT_FLUSHED = metrics.Counter('engagement_samples_flushed_total', 'Engagement samples written to Postgres')
+ENGAGEMENT_FLUSH_SECONDS = metrics.Histogram('engagement_flush_seconds', 'Time spent loading engagement samples into Postgres')
+ROLLUP_SECONDS = metrics.Histogram('engagement_rollup_seconds', 'Time spent computing an engagement rollup')
+
+class EngagementStore:
+    """Columnar in-memory time series of tweet engagement counts.
+
+    record_many() is called from the poll loop with every entry of the
+    feed just fetched, and only writes one row per tweet into
+    preallocated NumPy arrays, skipping tweets whose counts haven't
+    changed since the last sample. Rollups run on a worker thread
+    against a snapshot of the arrays. Arrays are never modified in place
+    below the current length (they are replaced when compacted), so a
+    snapshot stays valid while new samples keep arriving.
+    """
+
+    def __init__(self, retention=ENGAGEMENT_RETENTION, max_samples=ENGAGEMENT_MAX_SAMPLES, capacity=65536):
+        self.retention = retention
+        self.max_samples = max_samples
+        self.columns = {name: np.empty(capacity, dtype=dtype) for name, dtype in COLUMNS.items()}
+        self.size = 0
+        self.flushed = 0
+        self.handles = []
+        self._handle_index = {}
+        self._last_counts = OrderedDict()
+        self._conn = None
+        self._flush_lock = asyncio.Lock()
+
+    def _handle_id(self, handle: str) -> int:
+        handle = handle.lower()
+        index = self._handle_index.get(handle)
+        if index is None:
+            index = self._handle_index[handle] = len(self.handles)
+            self.handles.append(handle)
+        return index
+
+    def record(self, handle: str, tweet, now: Optional[float] = None):
+        self.record_counts(handle, tweet.id, tweet.metrics, now)
+
+    def record_counts(self, handle: str, tweet_id, engagement, now: Optional[float] = None):
+        counts = (engagement.reply_count, engagement.retweet_count, engagement.like_count)
+        tweet_id = int(tweet_id)
+        if self._last_counts.get(tweet_id) == counts:
+            return
+        self._last_counts[tweet_id] = counts
+        self._last_counts.move_to_end(tweet_id)
+        if len(self._last_counts) > ENGAGEMENT_TRACKED_TWEETS:
+            self._last_counts.popitem(last=False)
+
+        if self.size == len(self.columns['sampled_at']):
+            self._make_room()
+        row = self.size
+        columns = self.columns
+        columns['sampled_at'][row] = now if now is not None else time.time()
+        columns['tweet_id'][row] = tweet_id
+        columns['handle'][row] = self._handle_id(handle)
+        columns['replies'][row], columns['retweets'][row], columns['likes'][row] = counts
+        self.size += 1
+
+    def record_many(self, handle: str, samples: Iterable[Tuple[str, Metrics]], now: Optional[float] = None):
+        """Record (tweet_id, Metrics) pairs, e.g. every entry of a feed just polled"""
+        now = now if now is not None else time.time()
+        for tweet_id, engagement in samples:
+            self.record_counts(handle, tweet_id, engagement, now)
+
+    def _make_room(self):
+        """Drop expired samples and grow or trim the arrays into new ones"""
+        sampled_at = self.columns['sampled_at'][:self.size]
+        # Keep anything not yet written to Postgres, however old
+        start = min(int(np.searchsorted(sampled_at, time.time() - self.retention)), self.flushed)
+        live = self.size - start
+        capacity = len(sampled_at)
+        if live >= capacity // 2:
+            capacity = min(capacity * 2, self.max_samples)
+        if live >= capacity:
+            # At the hard cap: give up the oldest quarter
+            dropped = live - capacity * 3 // 4
+            logger.warning(f"Engagement store full, dropping {dropped} oldest samples")
+            start += dropped
+            live -= dropped
+
+        columns = {}
+        for name, column in self.columns.items():
+            columns[name] = np.empty(capacity, dtype=column.dtype)
+            columns[name][:live] = column[start:self.size]
+        self.columns = columns
+        self.size = live
+        self.flushed = max(0, self.flushed - start)
+        ENGAGEMENT_SAMPLES.set(live)
+
+    def snapshot(self) -> Dict[str, np.ndarray]:
+        """Views of every column up to the current length"""
+        snapshot = {name: column[:self.size] for name, column in self.columns.items()}
+        snapshot['handles'] = list(self.handles)
+        return snapshot
+
+    async def rollup(self, handles: Optional[List[str]] = None, window: float = 24 * 3600,
+                     top: int = 5) -> Dict:
+        """Summarise the last `window` seconds for the given handles (all if None)"""
+        snapshot = self.snapshot()
+        with ROLLUP_SECONDS.time():
+            return await asyncio.to_thread(rollup, snapshot, handles, window, top, time.time())
+
+    async def flush(self):
+        """Write samples recorded since the last flush to engagement_samples"""
+        async with self._flush_lock:
+            start, end = self.flushed, self.size
+            if start == end:
+                return 0
+            rows = {name: column[start:end].copy() for name, column in self.columns.items()}
+            handles = list(self.handles)
+            try:
+                with ENGAGEMENT_FLUSH_SECONDS.time():
+                    await asyncio.to_thread(self._copy_rows, rows, handles)
+            except Exception as e:
+                logger.error(f"Error flushing {end - start} engagement samples: {str(e)}")
+                if self._conn is not None:
+                    self._conn.close()
+                    self._conn = None
+                return 0
+            # Compaction may have shifted rows while the COPY ran
+            self.flushed = min(self.size, self.flushed + (end - start))
+            ENGAGEMENT_FLUSHED.inc(end - start)
+            ENGAGEMENT_SAMPLES.set(self.size)
+            return end - start
+
+    def _copy_rows(self, rows, handles):
+        if self._conn is None or self._conn.closed:
+            self._conn = connect()
+
+        data = io.StringIO()
+        for sampled_at, tweet_id, handle, replies, retweets, likes in zip(
+            rows['sampled_at'].tolist(), rows['tweet_id'].tolist(), rows['handle'].tolist(),
+            rows['replies'].tolist(), rows['retweets'].tolist(), rows['likes'].tolist()
+        ):
+            moment = datetime.fromtimestamp(sampled_at, tz=timezone.utc).isoformat()
+            data.write(f"{tweet_id}\t{handles[handle]}\t{moment}\t{replies}\t{retweets}\t{likes}\n")
+        data.seek(0)
+
+        with self._conn.cursor() as cur:
+            cur.copy_expert("""
+                COPY engagement_samples
+                (tweet_id, twitter_handle, sampled_at, reply_count, retweet_count, like_count)
+                FROM STDIN
+            """, data)
+        self._conn.commit()
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+def rollup(snapshot: Dict[str, np.ndarray], handles: Optional[List[str]], window: float,
+           top: int, now: float) -> Dict:
+    """Vectorized engagement rollup over a snapshot.
+
+    For each tweet seen in the window, velocity is the engagement
+    (replies + retweets + likes) gained since its first sample in the
+    window, per hour. Returns the top tweets by total engagement and by
+    velocity, and engagement gained per hour for each handle.
+    """
+    sampled_at = snapshot['sampled_at']
+    names = snapshot['handles']
+    mask = sampled_at >= now - window
+    if handles is not None:
+        wanted = {handle.lower() for handle in handles}
+        mask &= np.isin(snapshot['handle'], [i for i, name in enumerate(names) if name in wanted])
+
+    result = {'samples': int(mask.sum()), 'tweets': 0, 'top': [], 'fastest': [], 'handles': []}
+    if not result['samples']:
+        return result
+
+    sampled_at = sampled_at[mask]
+    tweet_id = snapshot['tweet_id'][mask]
+    handle = snapshot['handle'][mask]
+    replies = snapshot['replies'][mask]
+    retweets = snapshot['retweets'][mask]
+    likes = snapshot['likes'][mask]
+    engagement = replies.astype(np.int64) + retweets + likes
+
+    # Group samples by tweet, oldest first within each tweet
+    order = np.lexsort((sampled_at, tweet_id))
+    tweet_id = tweet_id[order]
+    starts = np.flatnonzero(np.r_[True, tweet_id[1:] != tweet_id[:-1]])
+    ends = np.r_[starts[1:], len(order)] - 1
+    first, last = order[starts], order[ends]
+    result['tweets'] = len(starts)
+
+    gained = engagement[last] - engagement[first]
+    span = np.maximum(now - sampled_at[first], MIN_VELOCITY_SPAN)
+    velocity = gained / span * 3600
+
+    def describe(indices):
+        return [{
+            'tweet_id': int(tweet_id[starts[i]]),
+            'twitter_handle': names[handle[last[i]]],
+            'replies': int(replies[last[i]]),
+            'retweets': int(retweets[last[i]]),
+            'likes': int(likes[last[i]]),
+            'engagement': int(engagement[last[i]]),
+            'velocity': float(velocity[i]),
+        } for i in indices]
+
+    def top_indices(values):
+        count = min(top, len(values))
+        candidates = np.argpartition(values, -count)[-count:]
+        return candidates[np.argsort(values[candidates])[::-1]]
+
+    result['top'] = describe(top_indices(engagement[last]))
+    result['fastest'] = describe(top_indices(velocity))
+
+    tweet_handles = handle[last]
+    per_handle = np.bincount(tweet_handles, weights=gained, minlength=len(names))
+    tweet_counts = np.bincount(tweet_handles, minlength=len(names))
+    seen = np.flatnonzero(tweet_counts)
+    hours = window / 3600
+    for index in seen[np.argsort(per_handle[seen])[::-1]]:
+        result['handles'].append({
+            'twitter_handle': names[index],
+            'tweets': int(tweet_counts[index]),
+            'per_hour': float(per_handle[index] / hours),
+        })
+    return result
@@ -0,0 +1,205 @@
+import argparse
+import asyncio
+import email.utils
+import logging
+import random
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from xml.sax.saxutils import escape
+from aiohttp import web
+
+logger = logging.getLogger('fake_nitter')
+
+TWITTER_EPOCH_MS = 1288834974657
+FEED_SIZE = 20
+
+class FakeNitter:
+    """Local stand-in for a Nitter instance serving synthetic RSS timelines.
+
+    Handles are named user00000, user00001, ... and each posts at its own
+    steady rate, so the newest tweet of any handle is a pure function of
+    the clock. That keeps responses cheap to generate at 10k+ handles.
+    """
+
+    def __init__(self, handles=100, latency=0.02, jitter=0.0, error_rate=0.0,
+                 not_modified=True, post_interval=60.0, seed=0, started=None, rate_limit=0.0):
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self._window_start = 0
+        self._window_requests = 0
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.not_modified = not_modified
+        # Mirrors built with the same seed and start time serve identical timelines
+        self.started = started or time.time()
+        self.base_url = ''
+        self._random = random.Random(seed)
+
+        # Spread posting intervals around the mean so some handles are
+        # chatty and most are quiet, like real timelines
+        self.handles = {}
+        for i in range(handles):
+            interval = max(1.0, self._random.expovariate(1 / post_interval))
+            phase = self._random.uniform(0, interval)
+            self.handles[f"user{i:05d}"] = (i, interval, phase)
+
+        self.requests = 0
+        self.statuses = Counter()
+
+    def tweet_count(self, handle, now=None):
+        _, interval, phase = self.handles[handle]
+        now = now if now is not None else time.time()
+        # Every handle starts with a backlog of FEED_SIZE tweets
+        return FEED_SIZE + int((now - self.started + phase) // interval)
+
+    def tweet_time(self, handle, seq):
+        _, interval, phase = self.handles[handle]
+        return self.started - phase + (seq - FEED_SIZE + 1) * interval
+
+    def tweet_id(self, handle, seq):
+        index = self.handles[handle][0]
+        created_ms = int(self.tweet_time(handle, seq) * 1000)
+        return ((created_ms - TWITTER_EPOCH_MS) << 22) | (index & 0x3FFFFF)
+
+    def render_item(self, handle, seq):
+        tweet_id = self.tweet_id(handle, seq)
+        created_at = datetime.fromtimestamp(self.tweet_time(handle, seq), tz=timezone.utc)
+        text = f"Synthetic tweet {seq} from @{handle} $SOL"
+        description = f"<p>{text}</p><p>{seq % 7} replies, {seq % 11} retweets, {seq % 13} likes</p>"
+        if seq % 3 == 0:
+            description += f'<img src="{self.base_url}/pic/media%2F{tweet_id}.jpg" />'
+        link = f"{self.base_url}/{handle}/status/{tweet_id}#m"
+        return (
+            "<item>"
+            f"<title>{escape(text)}</title>"
+            f"<dc:creator>@{handle}</dc:creator>"
+            f"<description>{escape(description)}</description>"
+            f"<pubDate>{email.utils.format_datetime(created_at, usegmt=True)}</pubDate>"
+            f"<guid>{link}</guid>"
+            f"<link>{link}</link>"
+            "</item>"
+        )
+
+    def render_feed(self, handle, count):
+        index = self.handles[handle][0]
+        items = ''.join(self.render_item(handle, seq) for seq in range(count - 1, max(-1, count - 1 - FEED_SIZE), -1))
+        return self._render_channel(f"User {index}", handle, index, items)
+
+    def render_combined_feed(self, handles, counts):
+        """Newest FEED_SIZE tweets across several handles, like user1,user2/rss"""
+        recent = []
+        for handle in handles:
+            count = counts[handle]
+            for seq in range(count - 1, max(-1, count - 1 - FEED_SIZE), -1):
+                recent.append((self.tweet_time(handle, seq), handle, seq))
+        recent.sort(reverse=True)
+        items = ''.join(self.render_item(handle, seq) for _, handle, seq in recent[:FEED_SIZE])
+        return self._render_channel('Combined timeline', ','.join(handles), 0, items)
+
+    def _render_channel(self, name, handle, index, items):
+        return (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            '<rss xmlns:atom="http://www.w3.org/2005/Atom" xmlns:dc="http://purl.org/dc/elements/1.1/" version="2.0">'
+            "<channel>"
+            f"<title>{name} / @{handle}</title>"
+            f"<link>{self.base_url}/{handle}</link>"
+            f"<description>Twitter feed for: @{handle}. Generated by {self.base_url}</description>"
+            f"<image><title>{name} / @{handle}</title><url>{self.base_url}/pic/profile_{index}.jpg</url></image>"
+            f"{items}"
+            "</channel></rss>"
+        )
+
+    async def handle_rss(self, request):
+        self.requests += 1
+        delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0)
+        if delay:
+            await asyncio.sleep(delay)
+
+        if self.rate_limit:
+            # Fixed one-second windows, answering 429 once a window is used up
+            now = time.time()
+            if int(now) != self._window_start:
+                self._window_start = int(now)
+                self._window_requests = 0
+            self._window_requests += 1
+            if self._window_requests > self.rate_limit:
+                return self._respond(web.Response(status=429, text='Too many requests', headers={'Retry-After': '1'}))
+
+        if self.error_rate and self._random.random() < self.error_rate:
+            return self._respond(web.Response(status=503, text='Service unavailable'))
+
+        handles = [handle for handle in request.match_info['user'].split(',') if handle in self.handles]
+        if not handles:
+            return self._respond(web.Response(status=404, text='User not found'))
+
+        now = time.time()
+        counts = {handle: self.tweet_count(handle, now) for handle in handles}
+        etag = '"' + '-'.join(f"{handle}.{count}" for handle, count in counts.items()) + '"'
+        newest = max(self.tweet_time(handle, count - 1) for handle, count in counts.items())
+        last_modified = email.utils.formatdate(newest, usegmt=True)
+        if self.not_modified and request.headers.get('If-None-Match') == etag:
+            return self._respond(web.Response(status=304, headers={'ETag': etag}))
+
+        if len(handles) == 1:
+            body = self.render_feed(handles[0], counts[handles[0]])
+        else:
+            body = self.render_combined_feed(handles, counts)
+
+        headers = {'ETag': etag, 'Last-Modified': last_modified} if self.not_modified else {}
+        return self._respond(web.Response(
+            text=body,
+            content_type='application/rss+xml',
+            headers=headers
+        ))
+
+    def _respond(self, response):
+        self.statuses[response.status] += 1
+        return response
+
+    def app(self):
+        app = web.Application()
+        app.router.add_get('/{user}/rss', self.handle_rss)
+        return app
+
+    async def start(self, host='127.0.0.1', port=8081):
+        """Serve on host:port and return the runner to clean up"""
+        self.base_url = f"http://{host}:{port}"
+        runner = web.AppRunner(self.app(), access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        logger.info(f"Fake Nitter serving {len(self.handles)} handles on {self.base_url}")
+        return runner
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Serve synthetic Nitter RSS feeds")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--handles', type=int, default=100)
+    parser.add_argument('--latency', type=float, default=0.02, help="Seconds added to every response")
+    parser.add_argument('--jitter', type=float, default=0.0, help="Extra random latency up to this many seconds")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of requests answered with 503")
+    parser.add_argument('--rate-limit', type=float, default=0.0, help="Requests per second before answering 429")
+    parser.add_argument('--no-304', action='store_true', help="Never answer conditional requests with 304")
+    parser.add_argument('--post-interval', type=float, default=60.0, help="Mean seconds between tweets per handle")
+    return parser.parse_args()
+
+async def serve(args):
+    server = FakeNitter(
+        handles=args.handles,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        not_modified=not args.no_304,
+        post_interval=args.post_interval,
+        rate_limit=args.rate_limit
+    )
+    runner = await server.start(args.host, args.port)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(serve(parse_args()))
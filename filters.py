@@ -0,0 +1,203 @@
+import re
+import logging
+from collections import deque
+from typing import Dict, Iterable, List, Set
+from config import FILTER_REGEX_MAX_LENGTH, FILTER_REGEX_MAX_REPEATS, FILTER_REGEX_TEXT_LIMIT
+
+logger = logging.getLogger('filters')
+
+_QUANTIFIER = re.compile(r'[*+?]|\{(\d*)(,?)(\d*)\}')
+
+def compile_filter_regex(pattern: str) -> re.Pattern:
+    """Compile a user supplied filter regex, rejecting ones that could backtrack for ages.
+
+    Patterns run against every tweet on the event loop, so only a subset
+    whose worst case stays small on FILTER_REGEX_TEXT_LIMIT characters is
+    accepted: at most FILTER_REGEX_MAX_LENGTH characters and
+    FILTER_REGEX_MAX_REPEATS variable-length quantifiers, and no repeated
+    group containing a quantifier or an alternation, like (a+)+ or
+    (a|aa)+. Raises ValueError.
+    """
+    if len(pattern) > FILTER_REGEX_MAX_LENGTH:
+        raise ValueError(f"Regular expressions are limited to {FILTER_REGEX_MAX_LENGTH} characters")
+    try:
+        compiled = re.compile(pattern, re.IGNORECASE)
+    except re.error as e:
+        raise ValueError(f"Invalid regular expression: {e}") from None
+
+    # [contains a quantifier, contains an alternation] per open group, the whole pattern at the bottom
+    groups = [[False, False]]
+    repeats = 0
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        quantifier = None
+        if char == '\\':
+            i += 2
+        elif char == '[':
+            # Skip the class; a leading ] (after an optional ^) is literal
+            i += 2 if pattern.startswith('[^', i) else 1
+            if pattern.startswith(']', i):
+                i += 1
+            while i < len(pattern) and pattern[i] != ']':
+                i += 2 if pattern[i] == '\\' else 1
+            i += 1
+        elif char == '(':
+            groups.append([False, False])
+            # The ? of (?:, (?P<name>, (?= etc. isn't a quantifier
+            i += 2 if pattern.startswith('(?', i) else 1
+        elif char == ')':
+            quantified, alternation = groups.pop()
+            i += 1
+            quantifier = _QUANTIFIER.match(pattern, i)
+            # An optional group (...)? only runs once, so it can't blow up
+            if quantifier and quantifier.group() != '?':
+                if quantified:
+                    raise ValueError("Nested quantifiers like (a+)+ are not allowed")
+                if alternation:
+                    raise ValueError("Repeated alternations like (a|aa)+ are not allowed")
+            groups[-1][0] = groups[-1][0] or quantified
+        elif char == '|':
+            groups[-1][1] = True
+            i += 1
+        else:
+            quantifier = _QUANTIFIER.match(pattern, i)
+            if not quantifier:
+                i += 1
+
+        if quantifier:
+            groups[-1][0] = True
+            low, comma, high = quantifier.groups()
+            if not (low is not None and not comma) and not (comma and low == high):
+                repeats += 1
+            i = quantifier.end()
+            # Lazy (*?) and possessive (*+) suffixes aren't quantifiers of their own
+            if pattern.startswith(('?', '+'), i):
+                i += 1
+    if repeats > FILTER_REGEX_MAX_REPEATS:
+        raise ValueError(f"Regular expressions may use at most {FILTER_REGEX_MAX_REPEATS} of *, +, ? or {{m,n}}")
+    return compiled
+
+class KeywordAutomaton:
+    """Aho-Corasick automaton matching many keywords in one pass over the text"""
+
+    def __init__(self, keywords: Iterable[str]):
+        self.keywords = []
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [set()]
+        for keyword in keywords:
+            self._add(keyword.casefold())
+        self._build()
+
+    def _add(self, keyword: str):
+        index = len(self.keywords)
+        self.keywords.append(keyword)
+        state = 0
+        for char in keyword:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(set())
+            state = next_state
+        self._output[state].add(index)
+
+    def _build(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                self._output[next_state] |= self._output[self._fail[next_state]]
+
+    def search(self, text: str) -> Set[int]:
+        """Indices of every keyword occurring anywhere in text"""
+        found = set()
+        state = 0
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        for char in text.casefold():
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                found |= output[state]
+        return found
+
+class HandleFilter:
+    """All filter rules of one handle's subscriptions, compiled together.
+
+    Keywords from every channel go into a single automaton and each
+    distinct regex is compiled once, so a tweet is scanned once no matter
+    how many channels filter it.
+    """
+
+    def __init__(self, accounts: List[Dict], rules: List[Dict]):
+        self.options = {
+            account['id']: (account.get('exclude_retweets', False), account.get('exclude_replies', False))
+            for account in accounts
+        }
+        self.rules = {}
+        keywords = {}
+        regexes = {}
+        for rule in rules:
+            if rule['is_regex']:
+                key = ('regex', regexes.setdefault(rule['pattern'], len(regexes)))
+            else:
+                key = ('keyword', keywords.setdefault(rule['pattern'].casefold(), len(keywords)))
+            include, exclude = self.rules.setdefault(rule['tracked_account_id'], (set(), set()))
+            (include if rule['mode'] == 'include' else exclude).add(key)
+
+        self.automaton = KeywordAutomaton(keywords)
+        self.regexes = []
+        for pattern in regexes:
+            try:
+                self.regexes.append(compile_filter_regex(pattern))
+            except ValueError as e:
+                logger.warning(f"Ignoring filter regex {pattern!r}: {e}")
+                self.regexes.append(None)
+
+    def match(self, tweet) -> Set[tuple]:
+        """Every rule key the tweet satisfies, computed once per tweet"""
+        matched = {('keyword', index) for index in self.automaton.search(tweet.text)}
+        # Bounds the worst case of the regexes, see compile_filter_regex
+        text = tweet.text[:FILTER_REGEX_TEXT_LIMIT]
+        for index, regex in enumerate(self.regexes):
+            if regex is not None and regex.search(text):
+                matched.add(('regex', index))
+        return matched
+
+    def allows(self, account_id: int, tweet, matched: Set[tuple]) -> bool:
+        exclude_retweets, exclude_replies = self.options.get(account_id, (False, False))
+        if exclude_retweets and tweet.is_retweet:
+            return False
+        if exclude_replies and tweet.is_reply:
+            return False
+        include, exclude = self.rules.get(account_id, ((), ()))
+        if include and not matched & include:
+            return False
+        if exclude and matched & exclude:
+            return False
+        return True
+
+def build_filters(subscriptions: Dict[str, List[Dict]], rules: List[Dict]) -> Dict[str, HandleFilter]:
+    """Compile a HandleFilter for every handle that has rules or exclusions"""
+    rules_by_account = {}
+    for rule in rules:
+        rules_by_account.setdefault(rule['tracked_account_id'], []).append(rule)
+
+    filters = {}
+    for handle, accounts in subscriptions.items():
+        handle_rules = [rule for account in accounts for rule in rules_by_account.get(account['id'], [])]
+        has_options = any(account.get('exclude_retweets') or account.get('exclude_replies') for account in accounts)
+        if handle_rules or has_options:
+            filters[handle] = HandleFilter(accounts, handle_rules)
+    return filters
@@ -1,5 +1,33 @@
+import gzip
+import hashlib
+import io
+import json
+import os
+import shutil
+import sys
 from PIL import Image, ImageDraw, ImageFilter
 
+DIST_DIR = 'static/dist'
+
+# Logical asset name (as used in templates) -> source file
+ASSETS = {
+    'css/style.css': 'static/css/style.css',
+    'js/animation.js': 'static/js/animation.js',
+    'images/bot_logo.png': 'static/images/bot_logo.png',
+    'images/twitter_banner.png': 'static/images/twitter_banner.png',
+    'images/icon.png': 'generated-icon.png',
+}
+
+# Resized copies to build, by width; templates ask for them with asset_url(name, width)
+VARIANTS = {
+    'images/bot_logo.png': (180, 360),
+    'images/twitter_banner.png': (750,),
+    'images/icon.png': (32, 180),
+}
+
+# Text assets also stored gzipped, so the server never compresses per request
+COMPRESSIBLE = ('.css', '.js', '.svg')
+
 def create_logo(size=512):
     # Create a new image with transparent background
     img = Image.new('RGBA', (size, size), (0, 0, 0, 0))
@@ -139,6 +167,51 @@ def create_banner(width=1500, height=500):
     result.save('static/images/twitter_banner.png', 'PNG')
     print("Banner generated successfully!")
 
+def _resize(data, width):
+    """PNG of the image scaled to width, or None if it isn't wider than that"""
+    with Image.open(io.BytesIO(data)) as image:
+        if image.width <= width:
+            return None
+        height = round(image.height * width / image.width)
+        resized = image.resize((width, height), Image.LANCZOS)
+    output = io.BytesIO()
+    resized.save(output, 'PNG', optimize=True)
+    return output.getvalue()
+
+def _write_asset(dist_dir, name, data):
+    """Store data under a content hash fingerprinted name and return that name"""
+    stem, extension = os.path.splitext(name)
+    fingerprinted = f"{stem}.{hashlib.sha256(data).hexdigest()[:12]}{extension}"
+    path = os.path.join(dist_dir, fingerprinted)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+    if extension in COMPRESSIBLE:
+        with open(path + '.gz', 'wb') as f:
+            f.write(gzip.compress(data, compresslevel=9, mtime=0))
+    return fingerprinted
+
+def build_assets(dist_dir=DIST_DIR):
+    """Build fingerprinted, resized and precompressed assets for production serving"""
+    shutil.rmtree(dist_dir, ignore_errors=True)
+    os.makedirs(dist_dir)
+    manifest = {}
+    for name, source in ASSETS.items():
+        with open(source, 'rb') as f:
+            data = f.read()
+        manifest[name] = _write_asset(dist_dir, name, data)
+        for width in VARIANTS.get(name, ()):
+            resized = _resize(data, width)
+            if resized is not None:
+                manifest[f"{name}@{width}"] = _write_asset(dist_dir, name, resized)
+
+    with open(os.path.join(dist_dir, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    print(f"Built {len(manifest)} assets into {dist_dir}")
+
 if __name__ == '__main__':
-    create_logo()
-    create_banner()
\ No newline at end of file
+    # --assets-only rebuilds static/dist from the images already on disk
+    if '--assets-only' not in sys.argv:
+        create_logo()
+        create_banner()
+    build_assets()
\ No newline at end of file
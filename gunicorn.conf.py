@@ -0,0 +1,13 @@
+import multiprocessing
+import os
+
+# Production server for main.py: `gunicorn -c gunicorn.conf.py main:app`
+bind = f"0.0.0.0:{os.environ.get('PORT', 3000)}"
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+# Threads keep a worker responsive while /media waits on an upstream image
+worker_class = 'gthread'
+threads = int(os.environ.get('WEB_THREADS', 4))
+# Import the app (and read the asset manifest) once, before forking
+preload_app = True
+keepalive = 5
+accesslog = None
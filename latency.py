@@ -0,0 +1,115 @@
+import math
+import time
+import logging
+from collections import deque
+from typing import Dict, Optional
+import metrics
+from config import LATENCY_WINDOW, SLOW_DELIVERY_THRESHOLD
+
+logger = logging.getLogger('latency')
+
+# Pipeline stages in order, from tweet creation to channel.send returning
+STAGES = ('created', 'fetched', 'parsed', 'diffed', 'queued', 'delivered')
+
+NOTIFICATION_LATENCY = metrics.Histogram(
+    'notification_latency_seconds',
+    'Time from tweet created_at to delivery in a channel',
+    ('instance',),
+    buckets=(1, 2.5, 5, 10, 15, 30, 60, 120, 300, 600, 1800)
+)
+
+def percentile(samples, q: float) -> Optional[float]:
+    """Nearest-rank percentile of a sequence of samples"""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    rank = max(0, math.ceil(q / 100 * len(ordered)) - 1)
+    return ordered[rank]
+
+def summarize(samples) -> Dict[str, Optional[float]]:
+    return {
+        'count': len(samples),
+        'p50': percentile(samples, 50),
+        'p95': percentile(samples, 95),
+        'p99': percentile(samples, 99),
+    }
+
+class LatencyTracker:
+    """Track end-to-end notification latency per handle and per instance"""
+
+    def __init__(self, window: int = LATENCY_WINDOW, slow_threshold: float = SLOW_DELIVERY_THRESHOLD):
+        self.window = window
+        self.slow_threshold = slow_threshold
+        self._all = deque(maxlen=window)
+        self._by_handle = {}
+        self._by_instance = {}
+
+    def start(self, tweet) -> Dict[str, float]:
+        """Begin a trace with the stages the client already timestamped"""
+        trace = {'created': tweet.created_at.timestamp()}
+        if tweet.fetched_at:
+            trace['fetched'] = tweet.fetched_at
+        if tweet.parsed_at:
+            trace['parsed'] = tweet.parsed_at
+        return trace
+
+    def mark(self, trace: Dict[str, float], stage: str) -> Dict[str, float]:
+        trace[stage] = time.time()
+        return trace
+
+    def delivered(self, trace: Dict[str, float], handle: str, instance: str, tweet_id: str) -> float:
+        """Close a trace and record its end-to-end latency"""
+        trace = dict(trace)
+        self.mark(trace, 'delivered')
+        total = trace['delivered'] - trace['created']
+
+        self._all.append(total)
+        self._by_handle.setdefault(handle, deque(maxlen=self.window)).append(total)
+        self._by_instance.setdefault(instance or 'unknown', deque(maxlen=self.window)).append(total)
+        NOTIFICATION_LATENCY.observe(total, instance=instance or 'unknown')
+
+        if total > self.slow_threshold:
+            logger.warning(
+                f"Slow delivery of tweet {tweet_id} from @{handle} via {instance or 'unknown'}: "
+                f"{total:.1f}s total ({self.format_trace(trace)})"
+            )
+        return total
+
+    @staticmethod
+    def format_trace(trace: Dict[str, float]) -> str:
+        """Describe the time spent between each recorded stage"""
+        steps = []
+        previous = None
+        for stage in STAGES:
+            if stage not in trace:
+                continue
+            if previous:
+                steps.append(f"{previous}→{stage} {trace[stage] - trace[previous]:.2f}s")
+            previous = stage
+        return ', '.join(steps)
+
+    def overall(self):
+        return summarize(self._all)
+
+    def for_handle(self, handle: str):
+        return summarize(self._by_handle.get(handle, ()))
+
+    def by_instance(self):
+        return {instance: summarize(samples) for instance, samples in self._by_instance.items()}
+
+    def by_handle(self):
+        return {handle: summarize(samples) for handle, samples in self._by_handle.items()}
+
+    def log_report(self):
+        stats = self.overall()
+        if not stats['count']:
+            return
+        logger.info(
+            f"Notification latency over {stats['count']} deliveries: "
+            f"p50 {stats['p50']:.1f}s, p95 {stats['p95']:.1f}s, p99 {stats['p99']:.1f}s"
+        )
+        for instance, instance_stats in self.by_instance().items():
+            logger.info(
+                f"  {instance}: p50 {instance_stats['p50']:.1f}s, p95 {instance_stats['p95']:.1f}s, "
+                f"p99 {instance_stats['p99']:.1f}s ({instance_stats['count']} deliveries)"
+            )
@@ -1,6 +1,12 @@
-from flask import Flask, render_template
+from flask import Flask, Response, render_template, request, send_file, send_from_directory, abort, url_for
+import gzip
+import hashlib
+import json
+import mimetypes
 import os
 from urllib.parse import quote
+from media_cache import MediaCache, MediaNotFound
+from config import MEDIA_MAX_AGE
 
 app = Flask(__name__)
 
@@ -15,11 +21,86 @@ OAUTH_URL = (
 
 TELEGRAM_BOT_USERNAME = 'xTrackSOL_bot'
 
+# Built by `python generate_logo.py`; without it assets are served from /static as-is
+DIST_DIR = os.path.join(app.static_folder, 'dist')
+ASSET_MAX_AGE = 365 * 24 * 3600  # Fingerprinted names change whenever the content does
+
+def load_manifest():
+    try:
+        with open(os.path.join(DIST_DIR, 'manifest.json')) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+manifest = load_manifest()
+media_cache = MediaCache()
+
+# (body, gzipped body, ETag) of the landing page, rendered on first request
+_index_page = None
+
+@app.template_global()
+def asset_url(name, width=None):
+    """URL of a built asset (or its resized variant), falling back to /static before a build"""
+    path = manifest.get(f"{name}@{width}") or manifest.get(name)
+    if path:
+        return url_for('asset', filename=path)
+    if os.path.exists(os.path.join(app.static_folder, name)):
+        return url_for('static', filename=name)
+    return None
+
+def accepts_gzip():
+    return 'gzip' in request.accept_encodings
+
 @app.route('/')
 def index():
-    return render_template('index.html', oauth_url=OAUTH_URL, bot_username=TELEGRAM_BOT_USERNAME)
+    global _index_page
+    if _index_page is None:
+        body = render_template('index.html', oauth_url=OAUTH_URL, bot_username=TELEGRAM_BOT_USERNAME).encode()
+        etag = hashlib.sha256(body).hexdigest()[:16]
+        _index_page = (body, gzip.compress(body, compresslevel=9, mtime=0), etag)
+    body, gzipped, etag = _index_page
+
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    elif accepts_gzip():
+        response = Response(gzipped, mimetype='text/html')
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        response = Response(body, mimetype='text/html')
+    response.set_etag(etag)
+    response.headers['Vary'] = 'Accept-Encoding'
+    # The page itself isn't fingerprinted, so browsers revalidate it (cheaply, via the ETag)
+    response.cache_control.no_cache = True
+    return response
+
+@app.route('/assets/<path:filename>')
+def asset(filename):
+    """Fingerprinted assets, cached forever and sent precompressed when possible"""
+    mimetype = mimetypes.guess_type(filename)[0]
+    precompressed = os.path.join(DIST_DIR, filename + '.gz')
+    if accepts_gzip() and os.path.exists(precompressed):
+        response = send_from_directory(DIST_DIR, filename + '.gz', mimetype=mimetype, max_age=ASSET_MAX_AGE)
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        response = send_from_directory(DIST_DIR, filename, mimetype=mimetype, max_age=ASSET_MAX_AGE)
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.cache_control.immutable = True
+    return response
+
+@app.route('/media/<path:key>')
+def media(key):
+    """Tweet images, fetched from upstream once and served from the local cache"""
+    width = request.args.get('w', type=int)
+    try:
+        path, content_type = media_cache.get(key, width)
+    except MediaNotFound:
+        abort(404)
+    except ValueError:
+        abort(400)
+    # Cached files are immutable: a key always maps to the same image
+    return send_file(path, mimetype=content_type, max_age=MEDIA_MAX_AGE, conditional=True)
 
 if __name__ == '__main__':
-    # Ensure we're binding to all network interfaces
+    # Development server; production runs `gunicorn -c gunicorn.conf.py main:app`
     port = int(os.environ.get('PORT', 3000))
-    app.run(host='0.0.0.0', port=port, debug=False)
\ No newline at end of file
+    app.run(host='0.0.0.0', port=port, debug=False)
@@ -0,0 +1,242 @@
+import hashlib
+import io
+import logging
+import os
+import re
+import tempfile
+import threading
+from concurrent.futures import Future
+from typing import Callable, Dict, Optional, Tuple
+from urllib.parse import quote, unquote, urlparse
+import requests
+from PIL import Image
+from config import (
+    NITTER_INSTANCES, REQUEST_TIMEOUT,
+    MEDIA_PUBLIC_URL, MEDIA_CACHE_DIR, MEDIA_CACHE_MAX_BYTES, MEDIA_MAX_IMAGE_BYTES,
+    MEDIA_PREVIEW_WIDTHS, MEDIA_EMBED_WIDTH, MEDIA_ORIGIN
+)
+
+logger = logging.getLogger('media_cache')
+
+# Image paths Nitter proxies from pbs.twimg.com, e.g. media/GabcXYZ.jpg
+MEDIA_KEY = re.compile(r'^(?!.*\.\.)(media|card_img|ext_tw_video_thumb|amplify_video_thumb|tweet_video_thumb)/[\w\-./]+(\?name=\w+)?$')
+
+FORMATS = {'JPEG': ('jpg', 'image/jpeg'), 'PNG': ('png', 'image/png'), 'WEBP': ('webp', 'image/webp'), 'GIF': ('gif', 'image/gif')}
+
+class MediaNotFound(Exception):
+    pass
+
+def media_key(url: str) -> Optional[str]:
+    """Mirror independent key of a Nitter /pic/ URL, or None for other URLs"""
+    path = urlparse(url).path
+    if not path.startswith('/pic/'):
+        return None
+    key = unquote(path[len('/pic/'):])
+    # Nitter also serves original-size images as /pic/orig/media%2F...
+    if key.startswith('orig/'):
+        key = key[len('orig/'):]
+    return key if MEDIA_KEY.match(key) else None
+
+def proxy_url(url: str, width: Optional[int] = MEDIA_EMBED_WIDTH) -> str:
+    """URL of an image through the media proxy, or the original when it can't be proxied"""
+    key = media_key(url)
+    if not MEDIA_PUBLIC_URL or key is None:
+        return url
+    proxied = f"{MEDIA_PUBLIC_URL}/media/{quote(key)}"
+    return f"{proxied}?w={width}" if width else proxied
+
+def _digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+class MediaCache:
+    """Content-addressed on-disk image cache with LRU eviction.
+
+    An image is fetched from upstream once per key and stored under the
+    SHA-256 of its bytes; refs/ maps each key to that digest, so the same
+    image reached through different keys is stored once. Resized
+    previews are stored next to their original. Reads touch the file's
+    mtime, and the least recently used files are evicted once the
+    directory grows past max_bytes. Writes go through a temp file and
+    os.replace, so several server workers can share one directory.
+    """
+
+    def __init__(self, directory: str = MEDIA_CACHE_DIR, max_bytes: int = MEDIA_CACHE_MAX_BYTES,
+                 instances=None, session: Optional[requests.Session] = None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.instances = list(instances or NITTER_INSTANCES)
+        self.session = session or requests.Session()
+        # Fetches and resizes in progress, so concurrent requests for the same one wait for it
+        self._inflight: Dict[tuple, Future] = {}
+        self._inflight_lock = threading.Lock()
+        for sub in ('objects', 'refs', 'tmp'):
+            os.makedirs(os.path.join(directory, sub), exist_ok=True)
+        self._size = self._scan_size()
+
+    def _once(self, token: tuple, compute: Callable):
+        """Run compute for token, or wait for the call already running for it.
+
+        Only requests for the same token wait on each other; a slow
+        upstream fetch doesn't hold up any other image.
+        """
+        with self._inflight_lock:
+            future = self._inflight.get(token)
+            running = future is not None
+            if not running:
+                future = self._inflight[token] = Future()
+        if running:
+            return future.result()
+        try:
+            result = compute()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._inflight_lock:
+                del self._inflight[token]
+
+    def _ref_path(self, key: str) -> str:
+        return os.path.join(self.directory, 'refs', hashlib.sha256(key.encode()).hexdigest())
+
+    def _object_path(self, digest: str, extension: str, width: Optional[int] = None) -> str:
+        name = f"{digest}-w{width}.{extension}" if width else f"{digest}.{extension}"
+        return os.path.join(self.directory, 'objects', digest[:2], name)
+
+    def get(self, key: str, width: Optional[int] = None) -> Tuple[str, str]:
+        """Path and content type of the image (or its preview), fetching it on a miss"""
+        if not MEDIA_KEY.match(key):
+            raise MediaNotFound(key)
+        if width is not None and width not in MEDIA_PREVIEW_WIDTHS:
+            raise ValueError(f"Unsupported preview width {width}")
+
+        original = self._lookup(key)
+        if original is None:
+            # One fetch per key even when many requests arrive at once
+            original = self._once(('fetch', key), lambda: self._lookup(key) or self._store(key, self._fetch(key)))
+        path, content_type, digest, extension = original
+        if width is None:
+            return path, content_type
+        return self._once(('preview', digest, width), lambda: self._preview(path, digest, extension, content_type, width))
+
+    def _lookup(self, key: str):
+        ref = self._ref_path(key)
+        try:
+            with open(ref) as f:
+                digest, extension, content_type = f.read().split()
+        except (OSError, ValueError):
+            return None
+        path = self._object_path(digest, extension)
+        if not os.path.exists(path):
+            return None
+        self._touch(ref)
+        self._touch(path)
+        return path, content_type, digest, extension
+
+    def _fetch(self, key: str) -> bytes:
+        urls = [f"{MEDIA_ORIGIN}/{key}"] + [f"{instance}/pic/{quote(key, safe='')}" for instance in self.instances]
+        for url in urls:
+            try:
+                with self.session.get(url, timeout=REQUEST_TIMEOUT, stream=True) as response:
+                    if response.status_code != 200:
+                        continue
+                    data = response.raw.read(MEDIA_MAX_IMAGE_BYTES + 1, decode_content=True)
+                    if len(data) > MEDIA_MAX_IMAGE_BYTES:
+                        logger.warning(f"Refusing {url}: larger than {MEDIA_MAX_IMAGE_BYTES} bytes")
+                        continue
+                    return data
+            except requests.RequestException as e:
+                logger.warning(f"Error fetching {url}: {str(e)}")
+        raise MediaNotFound(key)
+
+    def _store(self, key: str, data: bytes):
+        try:
+            with Image.open(io.BytesIO(data)) as image:
+                image_format = image.format
+        except Exception:
+            raise MediaNotFound(key)
+        if image_format not in FORMATS:
+            raise MediaNotFound(key)
+
+        extension, content_type = FORMATS[image_format]
+        digest = _digest(data)
+        path = self._object_path(digest, extension)
+        if not os.path.exists(path):
+            self._write(path, data)
+        self._write(self._ref_path(key), f"{digest} {extension} {content_type}".encode())
+        return path, content_type, digest, extension
+
+    def _preview(self, path: str, digest: str, extension: str, content_type: str, width: int) -> Tuple[str, str]:
+        preview = self._object_path(digest, extension, width)
+        if os.path.exists(preview):
+            self._touch(preview)
+            return preview, content_type
+
+        with Image.open(path) as image:
+            image_format = image.format
+            if image.width <= width or getattr(image, 'is_animated', False):
+                # Never upscale, and keep animations intact
+                return path, content_type
+            image.thumbnail((width, image.height * width // image.width), Image.LANCZOS)
+            output = io.BytesIO()
+            if image_format == 'JPEG':
+                image.convert('RGB').save(output, 'JPEG', quality=85, optimize=True, progressive=True)
+            else:
+                image.save(output, image_format)
+        self._write(preview, output.getvalue())
+        return preview, content_type
+
+    def _write(self, path: str, data: bytes):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp = tempfile.mkstemp(dir=os.path.join(self.directory, 'tmp'))
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(temp, path)
+        except BaseException:
+            os.unlink(temp)
+            raise
+        self._size += len(data)
+        if self._size > self.max_bytes:
+            self.evict()
+
+    def _touch(self, path: str):
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def _files(self):
+        for sub in ('objects', 'refs'):
+            for root, _, names in os.walk(os.path.join(self.directory, sub)):
+                for name in names:
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    yield stat.st_mtime, stat.st_size, path
+
+    def _scan_size(self) -> int:
+        return sum(size for _, size, _ in self._files())
+
+    def evict(self, target: Optional[int] = None):
+        """Delete least recently used files until the cache is under 90% of its budget"""
+        target = int(self.max_bytes * 0.9) if target is None else target
+        files = sorted(self._files())
+        total = sum(size for _, size, _ in files)
+        evicted = 0
+        for _, size, path in files:
+            if total <= target:
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                continue
+            total -= size
+            evicted += 1
+        self._size = total
+        if evicted:
+            logger.info(f"Evicted {evicted} cached media files, {total / 1024 / 1024:.0f} MiB left")
@@ -0,0 +1,164 @@
+import time
+import logging
+from contextlib import contextmanager
+from aiohttp import web
+from config import METRICS_HOST, METRICS_PORT
+
+logger = logging.getLogger('metrics')
+
+# Buckets in seconds, spanning fast DB calls up to slow poll cycles
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+def _format_labels(labelnames, values, extra=None):
+    pairs = list(zip(labelnames, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    escaped = []
+    for name, value in pairs:
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        escaped.append(f'{name}="{value}"')
+    return '{' + ','.join(escaped) + '}'
+
+class _Metric:
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        REGISTRY.register(self)
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self):
+        for key, value in self._values.items():
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {value}"
+
+class Counter(_Metric):
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+class Gauge(_Metric):
+    type = 'gauge'
+
+    def set(self, value, **labels):
+        self._values[self._key(labels)] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+class Histogram(_Metric):
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        state = self._values.get(key)
+        if state is None:
+            # Per-bucket (non-cumulative) counts, then sum and count
+            state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+        counts = state[0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+                break
+        state[1] += value
+        state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _samples(self):
+        for key, (counts, total, count) in self._values.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, key, ('le', bound))} {cumulative}"
+            yield f"{self.name}_bucket{_format_labels(self.labelnames, key, ('le', '+Inf'))} {count}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, key)} {total}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, key)} {count}"
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+REGISTRY = Registry()
+
+# Fetch path
+FETCHES = Counter('nitter_fetches_total', 'Feed requests sent to Nitter instances', ('instance', 'status'))
+FETCH_SECONDS = Histogram('nitter_fetch_seconds', 'Feed request latency per Nitter instance', ('instance',))
+RATE_LIMITED = Counter('nitter_rate_limited_total', '429 responses that paused an instance', ('instance',))
+INSTANCE_RATE = Gauge('nitter_instance_request_rate', 'Requests per second currently allotted to an instance', ('instance',))
+PARSES = Counter('feed_parses_total', 'RSS feeds parsed')
+PARSE_SECONDS = Histogram('feed_parse_seconds', 'Time spent parsing RSS feeds')
+
+# Poller
+POLL_CYCLE_SECONDS = Histogram('poll_cycle_seconds', 'Duration of a full check_tweets cycle')
+POLL_QUEUE_DEPTH = Gauge('poll_queue_depth', 'Handles still waiting to be polled in the current cycle')
+POLL_SHED = Gauge('poll_shed_handles', 'Handles skipped in the last cycle to stay within the poll budget')
+TRACKED_HANDLES = Gauge('tracked_handles', 'Distinct Twitter handles being tracked')
+DELIVERIES = Counter('deliveries_total', 'Tweet deliveries to Discord channels', ('result',))
+DELIVERY_SECONDS = Histogram('delivery_seconds', 'Time spent sending a tweet to a channel')
+
+# Render cache
+RENDER_CACHE = Counter('render_cache_requests_total', 'Rendered tweet cache lookups', ('result',))
+
+# Database
+DB_CALLS = Counter('db_calls_total', 'Database calls', ('method',))
+DB_SECONDS = Histogram('db_call_seconds', 'Database call latency', ('method',))
+
+async def handle_metrics(request):
+    return web.Response(text=REGISTRY.render(), content_type='text/plain', charset='utf-8')
+
+async def start_metrics_server(host=METRICS_HOST, port=METRICS_PORT):
+    """Serve /metrics in Prometheus text format from the running event loop.
+
+    Returns the runner to clean up on shutdown, or None if the address
+    couldn't be bound; the bot runs fine without metrics.
+    """
+    app = web.Application()
+    app.router.add_get('/metrics', handle_metrics)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    try:
+        await site.start()
+    except OSError as e:
+        logger.warning(f"Metrics endpoint disabled, could not listen on {host}:{port}: {str(e)}")
+        await runner.cleanup()
+        return None
+    logger.info(f"Metrics endpoint listening on http://{host}:{port}/metrics")
+    return runner
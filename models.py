@@ -0,0 +1,40 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional, Tuple
+
+# Compact, immutable records shared by the client, caches and renderers.
+# slots=True drops the per-instance __dict__, which is most of the memory
+# cost of buffering many tweets.
+
+@dataclass(frozen=True, slots=True)
+class Metrics:
+    reply_count: int = 0
+    retweet_count: int = 0
+    like_count: int = 0
+
+@dataclass(frozen=True, slots=True)
+class Media:
+    url: str
+    type: str = 'photo'
+
+@dataclass(frozen=True, slots=True)
+class Tweet:
+    id: str
+    text: str
+    created_at: datetime
+    metrics: Metrics
+    author: str = ''
+    media: Tuple[Media, ...] = ()
+    is_retweet: bool = False
+    is_reply: bool = False
+    # Where and when this copy was fetched, for latency tracking
+    instance: str = ''
+    fetched_at: float = 0.0
+    parsed_at: float = 0.0
+
+@dataclass(frozen=True, slots=True)
+class Profile:
+    username: str
+    name: str
+    id: str
+    profile_image_url: Optional[str] = None
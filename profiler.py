@@ -0,0 +1,172 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+import metrics
+from config import (
+    LOOP_LAG_INTERVAL, LOOP_LAG_THRESHOLD,
+    PROFILE_DIR, PROFILE_SAMPLE_INTERVAL, PROFILE_MAX_SECONDS, PROFILE_KEEP
+)
+
+logger = logging.getLogger('profiler')
+
+LOOP_LAG = metrics.Histogram(
+    'event_loop_lag_seconds', 'How late the event loop woke up for a timer',
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+)
+LOOP_STALLS = metrics.Counter('event_loop_stalls_total', 'Times the event loop was blocked past LOOP_LAG_THRESHOLD')
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+def _collapse(frame) -> str:
+    """Stack as root;...;leaf, the format flamegraph.pl and speedscope read"""
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    return ';'.join(reversed(labels))
+
+def _task_name(loop) -> str:
+    try:
+        task = asyncio.current_task(loop)
+    except RuntimeError:
+        return 'unknown'
+    return task.get_name() if task else 'no task (callback)'
+
+class LoopMonitor:
+    """Measure event loop lag and log whatever is blocking it.
+
+    A heartbeat task sleeps LOOP_LAG_INTERVAL and records how late it
+    woke up. A watchdog thread checks the heartbeat; once the loop has
+    been stuck for longer than the threshold it logs the loop thread's
+    current stack, which is the code doing the blocking, while it is
+    still running.
+    """
+
+    def __init__(self, interval: float = LOOP_LAG_INTERVAL, threshold: float = LOOP_LAG_THRESHOLD):
+        self.interval = interval
+        self.threshold = threshold
+        self.max_lag = 0.0
+        self._loop = None
+        self._thread_id = None
+        self._beat = time.monotonic()
+        self._task = None
+        self._watchdog = None
+        self._stopped = threading.Event()
+
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._thread_id = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._heartbeat(), name='loop-monitor')
+        self._watchdog = threading.Thread(target=self._watch, name='loop-watchdog', daemon=True)
+        self._watchdog.start()
+        logger.info(f"Watching event loop lag (stalls over {self.threshold:.1f}s are logged)")
+
+    def stop(self):
+        self._stopped.set()
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def _heartbeat(self):
+        while True:
+            scheduled = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(0.0, now - scheduled)
+            self._beat = now
+            self.max_lag = max(self.max_lag, lag)
+            LOOP_LAG.observe(lag)
+
+    def _watch(self):
+        reported = None
+        while not self._stopped.wait(self.interval):
+            beat = self._beat
+            stalled = time.monotonic() - beat - self.interval
+            if stalled < self.threshold or reported == beat:
+                continue
+            # Report each stall once, from inside it
+            reported = beat
+            LOOP_STALLS.inc()
+            frame = sys._current_frames().get(self._thread_id)
+            stack = ''.join(traceback.format_stack(frame)) if frame else '  (no frame)\n'
+            logger.warning(
+                f"Event loop blocked for {stalled:.2f}s in task {_task_name(self._loop)}:\n{stack.rstrip()}"
+            )
+
+class SamplingProfiler:
+    """Sample one thread's stack at a fixed interval from a helper thread.
+
+    Only the sampled thread's code is timed, so profiling the bot adds a
+    stack walk every PROFILE_SAMPLE_INTERVAL rather than tracing every
+    call like cProfile would.
+    """
+
+    def __init__(self, thread_id: int, interval: float = PROFILE_SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+
+    def run(self, seconds: float):
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[_collapse(frame)] += 1
+                self.samples += 1
+            del frame
+            time.sleep(self.interval)
+
+    def top_functions(self, count: int = 10) -> List[Tuple[str, float]]:
+        """Leaf functions by share of samples (self time)"""
+        leaves = Counter()
+        for stack, hits in self.stacks.items():
+            leaves[stack.rsplit(';', 1)[-1]] += hits
+        return [(label, hits / self.samples) for label, hits in leaves.most_common(count)] if self.samples else []
+
+    def write(self, path: str):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w') as f:
+            for stack, hits in self.stacks.most_common():
+                f.write(f"{stack} {hits}\n")
+
+def prune_profiles(directory: str, keep: int = PROFILE_KEEP):
+    """Delete all but the newest `keep` profiles in directory"""
+    names = sorted(name for name in os.listdir(directory) if name.startswith('profile-') and name.endswith('.folded'))
+    for name in names[:-keep] if keep else names:
+        try:
+            os.remove(os.path.join(directory, name))
+        except OSError as e:
+            logger.warning(f"Could not delete old profile {name}: {str(e)}")
+
+_profile_lock = asyncio.Lock()
+
+async def profile_loop(seconds: float, directory: str = PROFILE_DIR) -> Optional[Dict]:
+    """Profile the calling event loop's thread for `seconds` and write it to disk.
+
+    Returns the file path, sample count and hottest functions, or None
+    when a profile is already being captured.
+    """
+    if _profile_lock.locked():
+        return None
+    async with _profile_lock:
+        seconds = min(max(seconds, 1), PROFILE_MAX_SECONDS)
+        profiler = SamplingProfiler(threading.get_ident())
+        logger.info(f"Profiling event loop for {seconds:.0f}s")
+        await asyncio.to_thread(profiler.run, seconds)
+
+        path = os.path.join(directory, f"profile-{time.strftime('%Y%m%d-%H%M%S')}.folded")
+        await asyncio.to_thread(profiler.write, path)
+        await asyncio.to_thread(prune_profiles, directory)
+        logger.info(f"Wrote {profiler.samples} samples to {path}")
+        return {'path': path, 'samples': profiler.samples, 'top': profiler.top_functions()}
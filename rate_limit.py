@@ -0,0 +1,151 @@
+import asyncio
+import email.utils
+import logging
+import random
+import time
+from typing import Dict, List, Optional
+import metrics
+from config import (
+    GLOBAL_REQUEST_RATE, INSTANCE_CAPACITY, DEFAULT_INSTANCE_CAPACITY,
+    RATE_LIMIT_BURST, DEFAULT_RETRY_AFTER, RATE_LIMIT_MAX_WAIT
+)
+
+logger = logging.getLogger('rate_limit')
+
+def parse_retry_after(value: Optional[str], default: float = DEFAULT_RETRY_AFTER) -> float:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP-date)"""
+    if not value:
+        return default
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+        return max(0.0, retry_at.timestamp() - time.time())
+    except (TypeError, ValueError):
+        return default
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def configure(self, rate: float, capacity: float):
+        self._refill(time.monotonic())
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = min(self.tokens, capacity)
+
+    def paused(self, now: float) -> bool:
+        return now < self.paused_until
+
+    def try_acquire(self, now: float) -> bool:
+        if self.paused(now):
+            return False
+        self._refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def wait_time(self, now: float) -> float:
+        """Seconds until a token can be taken"""
+        if self.paused(now):
+            return self.paused_until - now
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate if self.rate > 0 else float('inf')
+
+class InstanceRateLimiter:
+    """Per-instance token buckets sharing one global request budget.
+
+    The global rate is split across instances in proportion to their
+    capacity, never exceeding any one instance's own capacity. An instance
+    that answers 429 is paused for its Retry-After and its share is handed
+    to the others until it comes back.
+    """
+
+    def __init__(self, instances: List[str], global_rate: float = GLOBAL_REQUEST_RATE,
+                 capacities: Optional[Dict[str, float]] = None):
+        self.global_rate = global_rate
+        self.capacities = dict(INSTANCE_CAPACITY if capacities is None else capacities)
+        self.buckets = {}
+        self.set_instances(instances)
+
+    def capacity(self, instance: str) -> float:
+        return self.capacities.get(instance, DEFAULT_INSTANCE_CAPACITY)
+
+    def set_instances(self, instances: List[str]):
+        for instance in instances:
+            if instance not in self.buckets:
+                rate = self.capacity(instance)
+                self.buckets[instance] = TokenBucket(rate, max(1.0, rate * RATE_LIMIT_BURST))
+        for instance in list(self.buckets):
+            if instance not in instances:
+                del self.buckets[instance]
+        self._rebalance()
+
+    def _rebalance(self):
+        now = time.monotonic()
+        healthy = [i for i, bucket in self.buckets.items() if not bucket.paused(now)]
+        total = sum(self.capacity(i) for i in healthy)
+        for instance, bucket in self.buckets.items():
+            capacity = self.capacity(instance)
+            share = self.global_rate * capacity / total if total and instance in healthy else capacity
+            rate = min(capacity, share)
+            bucket.configure(rate, max(1.0, rate * RATE_LIMIT_BURST))
+            metrics.INSTANCE_RATE.set(rate, instance=instance)
+
+    def pause(self, instance: str, seconds: float):
+        bucket = self.buckets.get(instance)
+        if bucket is None:
+            return
+        bucket.paused_until = max(bucket.paused_until, time.monotonic() + seconds)
+        metrics.RATE_LIMITED.inc(instance=instance)
+        logger.warning(f"Rate limited by {instance}, pausing it for {seconds:.0f}s")
+        self._rebalance()
+        # Give the instance its share back once the pause is over
+        asyncio.get_running_loop().call_later(seconds, self._rebalance)
+
+    def total_rate(self) -> float:
+        """Requests per second available across instances that aren't paused"""
+        now = time.monotonic()
+        return sum(bucket.rate for bucket in self.buckets.values() if not bucket.paused(now))
+
+    def is_paused(self, instance: str) -> bool:
+        bucket = self.buckets.get(instance)
+        return bucket is not None and bucket.paused(time.monotonic())
+
+    async def acquire(self, candidates: List[str]) -> Optional[str]:
+        """Take a token from one of the candidates, waiting if all are empty.
+
+        Returns the chosen instance, or None when every candidate is paused
+        (or starved) for longer than RATE_LIMIT_MAX_WAIT.
+        """
+        while True:
+            # Re-checked every pass: set_instances may retire a candidate while we sleep
+            buckets = {c: self.buckets[c] for c in candidates if c in self.buckets}
+            if not buckets:
+                return None
+            now = time.monotonic()
+            ready = [c for c, bucket in buckets.items() if bucket.wait_time(now) == 0]
+            if ready:
+                # Prefer instances with more headroom
+                weights = [buckets[c].rate for c in ready]
+                instance = random.choices(ready, weights=weights)[0]
+                if buckets[instance].try_acquire(now):
+                    return instance
+                continue
+
+            wait = min(bucket.wait_time(now) for bucket in buckets.values())
+            if wait > RATE_LIMIT_MAX_WAIT:
+                return None
+            await asyncio.sleep(wait)
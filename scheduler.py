@@ -0,0 +1,114 @@
+import math
+import time
+import logging
+from typing import Callable, Dict, List, Optional, Tuple
+from twitter_client import snowflake_timestamp
+from config import (
+    POLL_CYCLE_TARGET, TOP_LANE_FRACTION, TOP_LANE_BUDGET, STALE_LANE_BUDGET,
+    ACTIVITY_HALF_LIFE, ACTIVITY_WEIGHT
+)
+
+logger = logging.getLogger('scheduler')
+
+class PollScheduler:
+    """Decide which handles to poll in a cycle when not all of them fit.
+
+    Handles are ranked by subscriber count and recent activity. The budget
+    is spent in three lanes:
+
+    - top lane: the highest ranked TOP_LANE_FRACTION of handles, stalest
+      first, using at most TOP_LANE_BUDGET of the budget
+    - stale lane: STALE_LANE_BUDGET of the budget goes to whichever
+      handles have waited longest, regardless of priority, so every handle
+      has a bounded maximum poll interval
+    - the rest, ordered by priority times staleness
+
+    Budget a lane doesn't use carries over to the next one.
+    """
+
+    def __init__(self, cycle_target: float = POLL_CYCLE_TARGET, top_lane: float = TOP_LANE_FRACTION,
+                 top_lane_budget: float = TOP_LANE_BUDGET, stale_lane_budget: float = STALE_LANE_BUDGET):
+        self.cycle_target = cycle_target
+        self.top_lane = top_lane
+        self.top_lane_budget = top_lane_budget
+        self.stale_lane_budget = stale_lane_budget
+        self.last_polled = {}
+        # Requests per second actually achieved in saturated cycles
+        self.throughput = None
+
+    def priority(self, accounts: List[Dict], now: float) -> float:
+        cursors = [int(account['last_tweet_id']) for account in accounts if account['last_tweet_id']]
+        activity = 0.0
+        if cursors:
+            age = max(0.0, now - snowflake_timestamp(max(cursors)))
+            activity = 0.5 ** (age / ACTIVITY_HALF_LIFE)
+        return math.log2(1 + len(accounts)) + ACTIVITY_WEIGHT * activity
+
+    def budget(self, max_rate: Optional[float]) -> float:
+        """Request cost that should fit in one cycle"""
+        rates = [rate for rate in (self.throughput, max_rate) if rate]
+        if not rates:
+            return float('inf')
+        # Offer a little more than last time so the estimate can grow
+        return min(rates) * self.cycle_target * 1.1
+
+    def plan(self, subscriptions: Dict[str, List[Dict]], cost: Callable[[str], float],
+             max_rate: Optional[float] = None) -> Tuple[List[str], int]:
+        """Return the handles to poll this cycle, in lane order, and how many were shed"""
+        now = time.time()
+        monotonic_now = time.monotonic()
+        for handle in list(self.last_polled):
+            if handle not in subscriptions:
+                del self.last_polled[handle]
+
+        priorities = {handle: self.priority(accounts, now) for handle, accounts in subscriptions.items()}
+        ranked = sorted(priorities, key=priorities.get, reverse=True)
+        top_size = math.ceil(len(ranked) * self.top_lane)
+
+        def staleness(handle):
+            polled = self.last_polled.get(handle)
+            if polled is None:
+                return float('inf')
+            return (monotonic_now - polled) / self.cycle_target
+
+        budget = self.budget(max_rate)
+        selected = []
+        chosen = set()
+        spent = 0.0
+
+        def fill(handles, limit):
+            nonlocal spent
+            for handle in handles:
+                if handle in chosen:
+                    continue
+                handle_cost = cost(handle)
+                if spent + handle_cost > limit and selected:
+                    continue
+                selected.append(handle)
+                chosen.add(handle)
+                spent += handle_cost
+
+        top = sorted(ranked[:top_size], key=staleness, reverse=True)
+        fill(top, budget * self.top_lane_budget)
+        stalest = sorted(ranked, key=staleness, reverse=True)
+        fill(stalest, spent + budget * self.stale_lane_budget)
+        # Stable sort keeps rank order among never-polled handles
+        fill(sorted(ranked, key=lambda h: priorities[h] * staleness(h), reverse=True), budget)
+
+        shed = len(ranked) - len(selected)
+        if shed:
+            logger.info(f"Poll budget {budget:.0f} requests: polling {len(selected)} handles, shed {shed}")
+        return selected, shed
+
+    def mark_polled(self, handle: str):
+        self.last_polled[handle] = time.monotonic()
+
+    def record_cycle(self, cost_spent: float, seconds: float, saturated: bool):
+        """Update the throughput estimate from a cycle that used its whole budget"""
+        if not saturated or seconds <= 0 or cost_spent <= 0:
+            return
+        observed = cost_spent / seconds
+        if self.throughput is None:
+            self.throughput = observed
+        else:
+            self.throughput = 0.7 * self.throughput + 0.3 * observed
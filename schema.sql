@@ -8,4 +8,55 @@ CREATE TABLE IF NOT EXISTS tracked_accounts (
 );
 
 CREATE INDEX IF NOT EXISTS idx_tracked_accounts_channel 
-ON tracked_accounts(channel_id);
\ No newline at end of file
+ON tracked_accounts(channel_id);
+
+-- Per-subscription delivery filters
+ALTER TABLE tracked_accounts ADD COLUMN IF NOT EXISTS exclude_retweets BOOLEAN NOT NULL DEFAULT FALSE;
+ALTER TABLE tracked_accounts ADD COLUMN IF NOT EXISTS exclude_replies BOOLEAN NOT NULL DEFAULT FALSE;
+
+CREATE TABLE IF NOT EXISTS subscription_filters (
+    id SERIAL PRIMARY KEY,
+    tracked_account_id INTEGER NOT NULL REFERENCES tracked_accounts(id) ON DELETE CASCADE,
+    mode VARCHAR(7) NOT NULL CHECK (mode IN ('include', 'exclude')),
+    pattern TEXT NOT NULL,
+    is_regex BOOLEAN NOT NULL DEFAULT FALSE,
+    UNIQUE(tracked_account_id, pattern)
+);
+
+
+-- Archive of every tweet seen by the poller, partitioned by month.
+-- Monthly partitions are created by the archiver before it loads rows.
+CREATE TABLE IF NOT EXISTS tweet_archive (
+    tweet_id BIGINT NOT NULL,
+    twitter_handle VARCHAR(15) NOT NULL,
+    author VARCHAR(15) NOT NULL,
+    text TEXT NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL,
+    is_retweet BOOLEAN NOT NULL DEFAULT FALSE,
+    is_reply BOOLEAN NOT NULL DEFAULT FALSE,
+    reply_count INTEGER NOT NULL DEFAULT 0,
+    retweet_count INTEGER NOT NULL DEFAULT 0,
+    like_count INTEGER NOT NULL DEFAULT 0,
+    media_urls TEXT[] NOT NULL DEFAULT '{}',
+    archived_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (tweet_id, created_at)
+) PARTITION BY RANGE (created_at);
+
+CREATE INDEX IF NOT EXISTS idx_tweet_archive_handle
+ON tweet_archive(twitter_handle, created_at DESC);
+
+CREATE INDEX IF NOT EXISTS idx_tweet_archive_text
+ON tweet_archive USING GIN (to_tsvector('english', text));
+
+-- Engagement counts sampled on every poll that saw them change
+CREATE TABLE IF NOT EXISTS engagement_samples (
+    tweet_id BIGINT NOT NULL,
+    twitter_handle VARCHAR(15) NOT NULL,
+    sampled_at TIMESTAMPTZ NOT NULL,
+    reply_count INTEGER NOT NULL,
+    retweet_count INTEGER NOT NULL,
+    like_count INTEGER NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_engagement_samples_handle
+ON engagement_samples(twitter_handle, sampled_at);
@@ -0,0 +1,47 @@
+import asyncio
+from datetime import datetime, timezone
+import archive
+from archive import TweetArchiver
+from models import Tweet, Metrics
+
+def make_tweet(i, text='Tweet'):
+    return Tweet(
+        id=str(1800000000000000000 + i),
+        text=text,
+        created_at=datetime.now(timezone.utc),
+        metrics=Metrics(reply_count=0, retweet_count=0, like_count=0),
+    )
+
+def test_failed_load_is_retried_then_dropped(monkeypatch):
+    archiver = TweetArchiver()
+    loads = []
+
+    def failing_copy(rows):
+        loads.append(len(rows))
+        raise RuntimeError("connection lost")
+
+    monkeypatch.setattr(archiver, '_copy_rows', failing_copy)
+    archiver.add('nasa', make_tweet(1))
+    for _ in range(archive.ARCHIVE_MAX_ATTEMPTS):
+        assert asyncio.run(archiver.flush()) == 0
+    assert loads == [1] * archive.ARCHIVE_MAX_ATTEMPTS
+    assert archiver.buffer == []
+    # Dropped tweets can be archived again if they are fetched again
+    archiver.add('nasa', make_tweet(1))
+    assert len(archiver.buffer) == 1
+
+def test_failed_load_keeps_rows_for_next_flush(monkeypatch):
+    archiver = TweetArchiver()
+    attempts = []
+
+    def flaky_copy(rows):
+        attempts.append([tweet.id for _, tweet, _ in rows])
+        if len(attempts) == 1:
+            raise RuntimeError("connection lost")
+
+    monkeypatch.setattr(archiver, '_copy_rows', flaky_copy)
+    archiver.add('nasa', make_tweet(1, text=''))
+    asyncio.run(archiver.flush())
+    archiver.add('nasa', make_tweet(2))
+    assert asyncio.run(archiver.flush()) == 2
+    assert attempts[1] == [make_tweet(1).id, make_tweet(2).id]
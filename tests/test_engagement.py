@@ -0,0 +1,28 @@
+import feedparser
+from fake_nitter import FakeNitter, FEED_SIZE
+from twitter_client import TwitterClient
+from engagement import EngagementStore
+
+def test_every_feed_entry_is_sampled():
+    nitter = FakeNitter(handles=2)
+    client = TwitterClient(['https://nitter.example'])
+    feed = feedparser.parse(nitter.render_feed('user00000', FEED_SIZE + 5))
+    samples = client._feed_engagement(feed.entries)
+    assert len(samples) == FEED_SIZE
+    assert {owner for owner, _, _ in samples} == {'user00000'}
+
+    store = EngagementStore(capacity=64)
+    store.record_many('user00000', [(tweet_id, counts) for _, tweet_id, counts in samples], now=1000.0)
+    assert store.size == FEED_SIZE
+    # Unchanged counts on the next poll add nothing
+    store.record_many('user00000', [(tweet_id, counts) for _, tweet_id, counts in samples], now=1060.0)
+    assert store.size == FEED_SIZE
+
+def test_combined_feed_samples_are_credited_to_their_owner():
+    nitter = FakeNitter(handles=2)
+    client = TwitterClient(['https://nitter.example'])
+    counts = {'user00000': FEED_SIZE, 'user00001': FEED_SIZE}
+    feed = feedparser.parse(nitter.render_combined_feed(list(counts), counts))
+    owners = [owner for owner, _, _ in client._feed_engagement(feed.entries)]
+    assert len(owners) == FEED_SIZE
+    assert set(owners) <= set(counts)
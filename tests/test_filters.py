@@ -0,0 +1,55 @@
+import random
+from types import SimpleNamespace
+import pytest
+from filters import KeywordAutomaton, HandleFilter, compile_filter_regex
+
+def naive_search(keywords, text):
+    text = text.casefold()
+    return {index for index, keyword in enumerate(keywords) if keyword.casefold() in text}
+
+def test_overlapping_keywords():
+    keywords = ['he', 'she', 'his', 'hers']
+    automaton = KeywordAutomaton(keywords)
+    # "ushers" holds she, he and hers, each ending inside another
+    assert automaton.search('ushers') == {0, 1, 3}
+    assert automaton.search('HIS') == {2}
+    assert automaton.search('nothing here') == {0}
+    assert automaton.search('') == set()
+
+def test_failure_links():
+    automaton = KeywordAutomaton(['abcd', 'bc', 'bcx', 'c'])
+    # After "abc" fails on "x" the match must resume in "bc", not from scratch
+    assert automaton.search('abcx') == {1, 2, 3}
+    # Output of a suffix state is reported from a deeper one
+    assert automaton.search('abcd') == {0, 1, 3}
+    assert automaton.search('aabab') == set()
+
+def test_matches_naive_search():
+    rng = random.Random(0)
+    for _ in range(200):
+        keywords = [''.join(rng.choice('abA') for _ in range(rng.randint(1, 4))) for _ in range(rng.randint(1, 8))]
+        text = ''.join(rng.choice('abB') for _ in range(rng.randint(0, 30)))
+        assert KeywordAutomaton(keywords).search(text) == naive_search(keywords, text)
+
+@pytest.mark.parametrize('pattern', [
+    r'(a+)+', r'(\w*\s?)*', r'((a)+b)*', r'(?:x*){2,}', r'(a|aa)+$', r'(?:a|b){20}', r'a*a*a*b', r'.*a.*a.*b',
+    'a?' * 30 + 'a' * 30, 'a' * 101, '(',
+])
+def test_rejects_unsafe_regex(pattern):
+    with pytest.raises(ValueError):
+        compile_filter_regex(pattern)
+
+@pytest.mark.parametrize('pattern', [
+    r'\$SOL\b', r'(\d+)?', r'[(+)]+', r'(foo|bar)', r'(?i)pump\s+it', r'https?://\S+', r'\$[A-Z]{3}\b', r'x+?y*?',
+])
+def test_accepts_safe_regex(pattern):
+    assert compile_filter_regex(pattern)
+
+def test_unsafe_stored_regex_is_ignored():
+    rules = [
+        {'tracked_account_id': 1, 'pattern': r'(a+)+$', 'is_regex': True, 'mode': 'exclude'},
+        {'tracked_account_id': 1, 'pattern': 'sol', 'is_regex': False, 'mode': 'include'},
+    ]
+    handle_filter = HandleFilter([{'id': 1}], rules)
+    tweet = SimpleNamespace(text='a' * 40 + '! $SOL', is_retweet=False, is_reply=False)
+    assert handle_filter.allows(1, tweet, handle_filter.match(tweet))
@@ -0,0 +1,53 @@
+import io
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image
+from media_cache import MediaCache
+
+def png(color):
+    output = io.BytesIO()
+    Image.new('RGB', (1400, 10), color).save(output, 'PNG')
+    return output.getvalue()
+
+class FakeResponse:
+    def __init__(self, data):
+        self.status_code = 200
+        self.data = data
+        self.raw = self
+
+    def read(self, size, decode_content=False):
+        return self.data[:size]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+class FakeSession:
+    """Upstream whose media/slow.png hangs until released"""
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.fetches = []
+
+    def get(self, url, timeout=None, stream=False):
+        self.fetches.append(url)
+        if 'slow' in url:
+            assert self.release.wait(5)
+            return FakeResponse(png('red'))
+        return FakeResponse(png('blue'))
+
+def test_slow_fetch_only_blocks_its_own_key(tmp_path):
+    session = FakeSession()
+    cache = MediaCache(str(tmp_path), instances=[], session=session)
+    with ThreadPoolExecutor(4) as pool:
+        slow = [pool.submit(cache.get, 'media/slow.png') for _ in range(2)]
+        # Every other key is served while the slow image is still downloading
+        for i in range(200):
+            path, content_type = cache.get(f'media/fast{i}.png', 640)
+            assert content_type == 'image/png'
+        assert not any(future.done() for future in slow)
+        session.release.set()
+        assert slow[0].result() == slow[1].result()
+    assert sum('slow' in url for url in session.fetches) == 1
@@ -0,0 +1,12 @@
+import asyncio
+import socket
+from metrics import start_metrics_server
+
+def test_metrics_server_is_optional_when_port_is_taken():
+    async def run():
+        with socket.socket() as taken:
+            taken.bind(('127.0.0.1', 0))
+            taken.listen()
+            return await start_metrics_server('127.0.0.1', taken.getsockname()[1])
+
+    assert asyncio.run(run()) is None
@@ -0,0 +1,11 @@
+import os
+from profiler import prune_profiles
+
+def test_prune_keeps_newest_profiles(tmp_path):
+    for day in range(1, 6):
+        (tmp_path / f"profile-2026010{day}-120000.folded").write_text('main 1\n')
+    (tmp_path / 'notes.txt').write_text('kept')
+    prune_profiles(str(tmp_path), keep=2)
+    assert sorted(os.listdir(tmp_path)) == [
+        'notes.txt', 'profile-20260104-120000.folded', 'profile-20260105-120000.folded'
+    ]
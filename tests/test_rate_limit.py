@@ -0,0 +1,33 @@
+import asyncio
+from rate_limit import InstanceRateLimiter
+
+A = 'https://a.example'
+B = 'https://b.example'
+
+def drain(limiter, instance):
+    bucket = limiter.buckets[instance]
+    bucket.tokens = 0
+
+def test_acquire_survives_instance_retired_while_waiting():
+    async def run():
+        limiter = InstanceRateLimiter([A, B], global_rate=20, capacities={A: 10, B: 10})
+        drain(limiter, A)
+        drain(limiter, B)
+        waiting = asyncio.create_task(limiter.acquire([A, B]))
+        await asyncio.sleep(0)
+        # Discovery drops A while acquire() sleeps for a token
+        limiter.set_instances([B])
+        return await waiting
+
+    assert asyncio.run(run()) == B
+
+def test_acquire_returns_none_when_every_candidate_is_retired():
+    async def run():
+        limiter = InstanceRateLimiter([A, B], global_rate=20, capacities={A: 10, B: 10})
+        drain(limiter, A)
+        waiting = asyncio.create_task(limiter.acquire([A]))
+        await asyncio.sleep(0)
+        limiter.set_instances([B])
+        return await waiting
+
+    assert asyncio.run(run()) is None
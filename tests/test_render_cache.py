@@ -0,0 +1,25 @@
+from datetime import datetime, timezone
+from models import Tweet, Metrics, Profile
+from utils import create_tweet_embed
+
+def make_tweet(is_retweet):
+    return Tweet(
+        id='1800000000000000001',
+        text='Shared tweet',
+        created_at=datetime.now(timezone.utc),
+        metrics=Metrics(reply_count=0, retweet_count=0, like_count=0),
+        author='X',
+        is_retweet=is_retweet,
+    )
+
+def test_same_tweet_renders_per_handle():
+    retweeted = create_tweet_embed(make_tweet(True), Profile(username='A', name='Alice', id='A'))
+    original = create_tweet_embed(make_tweet(False), Profile(username='X', name='Xavier', id='X'))
+    assert retweeted is not original
+    assert retweeted.author.name == 'Alice (@A)'
+    assert original.author.name == 'Xavier (@X)'
+    assert retweeted.color != original.color
+
+def test_fan_out_reuses_render():
+    profile = Profile(username='X', name='Xavier', id='X')
+    assert create_tweet_embed(make_tweet(False), profile) is create_tweet_embed(make_tweet(False), profile)
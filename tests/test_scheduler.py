@@ -0,0 +1,57 @@
+import math
+import scheduler
+from scheduler import PollScheduler
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+def make_subscriptions(count):
+    # A few popular handles, the rest with a single subscriber
+    return {
+        f"user{i:04d}": [{'last_tweet_id': None}] * (20 if i < count // 20 else 1)
+        for i in range(count)
+    }
+
+def run_cycles(monkeypatch, handles, cycles, max_rate=10, cycle_target=5):
+    clock = FakeClock()
+    monkeypatch.setattr(scheduler.time, 'monotonic', clock)
+    subscriptions = make_subscriptions(handles)
+    poller = PollScheduler(cycle_target=cycle_target)
+    polled_at = {handle: [] for handle in subscriptions}
+    for cycle in range(cycles):
+        selected, shed = poller.plan(subscriptions, lambda handle: 1, max_rate)
+        assert len(selected) == len(set(selected))
+        assert len(selected) + shed == handles
+        for handle in selected:
+            poller.mark_polled(handle)
+            polled_at[handle].append(cycle)
+        poller.record_cycle(len(selected), cycle_target, shed > 0)
+        clock.now += cycle_target
+    return poller, polled_at
+
+def test_plan_polls_every_handle_within_bounded_interval(monkeypatch):
+    handles = 1000
+    budget = 10 * 5 * 1.1
+    # The stale lane alone covers every handle in this many cycles
+    bound = math.ceil(handles / math.floor(budget * scheduler.STALE_LANE_BUDGET))
+    poller, polled_at = run_cycles(monkeypatch, handles, cycles=3 * bound)
+
+    for handle, cycles in polled_at.items():
+        assert cycles, f"{handle} was never polled"
+        gaps = [b - a for a, b in zip([-1] + cycles, cycles + [3 * bound])]
+        assert max(gaps) <= bound, f"{handle} waited {max(gaps)} cycles"
+
+def test_plan_favours_top_lane_without_starving_it(monkeypatch):
+    _, polled_at = run_cycles(monkeypatch, handles=1000, cycles=60)
+    popular = [len(cycles) for handle, cycles in polled_at.items() if int(handle[4:]) < 50]
+    quiet = [len(cycles) for handle, cycles in polled_at.items() if int(handle[4:]) >= 50]
+    assert min(popular) > 4 * sum(quiet) / len(quiet)
+    assert min(quiet) > 0
+
+def test_plan_polls_everything_when_under_budget(monkeypatch):
+    _, polled_at = run_cycles(monkeypatch, handles=20, cycles=3)
+    assert all(cycles == [0, 1, 2] for cycles in polled_at.values())
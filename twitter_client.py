@@ -4,17 +4,27 @@ from datetime import datetime
 from urllib.parse import quote
 import asyncio
 import aiohttp
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, Tuple
 import email.utils
 import logging
-import random
-from config import NITTER_INSTANCES, REQUEST_TIMEOUT, MAX_CONCURRENT_REQUESTS
+import time
+from collections import OrderedDict
+import metrics
+from rate_limit import InstanceRateLimiter, parse_retry_after
+from config import NITTER_INSTANCES, REQUEST_TIMEOUT, MAX_CONCURRENT_REQUESTS, BATCH_FEED_SIZE, PROFILE_CACHE_SIZE, VALIDATOR_CACHE_SIZE
+from models import Tweet, Media, Metrics, Profile
 
 logger = logging.getLogger('twitter_client')
 
+TWITTER_EPOCH_MS = 1288834974657
+
+def snowflake_timestamp(tweet_id) -> float:
+    """Unix time a tweet was created, decoded from its snowflake id"""
+    return ((int(tweet_id) >> 22) + TWITTER_EPOCH_MS) / 1000
+
 class TwitterClient:
-    def __init__(self):
-        self.instances = NITTER_INSTANCES
+    def __init__(self, instances: Optional[List[str]] = None):
+        self.instances = list(instances or NITTER_INSTANCES)
         self.timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT, connect=1)
         self.session = None
         self.headers = {
@@ -22,7 +32,22 @@ class TwitterClient:
             'Accept': 'application/rss+xml'
         }
         self.semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+        self.rate_limiter = InstanceRateLimiter(self.instances)
         self._failed_instances = set()
+        # (instance, username) -> (etag, last_modified, feed) for conditional requests
+        self._validators = OrderedDict()
+        # username -> Profile from the newest single-user feed header seen
+        self._profiles = OrderedDict()
+        # username -> (tweet_id, Metrics) of every entry in the feed last polled for them
+        self._engagement = {}
+
+    def set_instances(self, instances: List[str]):
+        """Replace the instance rotation while running, e.g. after discovery"""
+        self.instances = list(instances)
+        self.rate_limiter.set_instances(self.instances)
+        self._failed_instances &= set(self.instances)
+        for key in [key for key in self._validators if key[0] not in self.instances]:
+            del self._validators[key]
 
     async def _get_session(self) -> aiohttp.ClientSession:
         """Get or create aiohttp session with connection pooling"""
@@ -35,7 +60,7 @@ class TwitterClient:
             )
         return self.session
 
-    async def get_user_by_username(self, username: str) -> Optional[Dict]:
+    async def get_user_by_username(self, username: str) -> Optional[Profile]:
         """Get user information from their feed"""
         async with self.semaphore:  # Limit concurrent requests
             try:
@@ -44,18 +69,29 @@ class TwitterClient:
                     logger.warning(f"Could not fetch feed for user @{username}")
                     return None
 
-                name = feed.feed.title.split("'")[0].strip()
-                return {
-                    'username': username.strip('@'),
-                    'name': name,
-                    'id': username.strip('@'),
-                    'profile_image_url': feed.feed.image.href if hasattr(feed.feed, 'image') else None
-                }
+                return self._parse_profile(feed, username)
             except Exception as e:
                 logger.error(f"Error getting user {username}: {str(e)}")
                 return None
 
-    async def get_recent_tweets(self, username: str) -> List[Dict]:
+    async def get_user_and_tweets(self, username: str) -> Tuple[Optional[Profile], List[Tweet]]:
+        """Get user information and their most recent tweet from a single feed request"""
+        async with self.semaphore:  # Limit concurrent requests
+            try:
+                feed = await self._try_fetch_feed(username)
+                if not feed or not feed.feed:
+                    logger.warning(f"Could not fetch feed for user @{username}")
+                    return None, []
+
+                tweets = []
+                if feed.entries:
+                    tweets.append(self._parse_entry(feed.entries[0], username, feed))
+                return self._parse_profile(feed, username), tweets
+            except Exception as e:
+                logger.error(f"Error getting user {username}: {str(e)}")
+                return None, []
+
+    async def get_recent_tweets(self, username: str) -> List[Tweet]:
         """Get most recent tweet only with fallback instances"""
         async with self.semaphore:  # Limit concurrent requests
             try:
@@ -64,22 +100,14 @@ class TwitterClient:
                     logger.warning(f"No tweets found for @{username}")
                     return []
 
+                self._parse_profile(feed, username)
+                self._engagement[username.strip('@').strip().lower()] = [
+                    (tweet_id, counts) for _, tweet_id, counts in feed.get('engagement', ())
+                ]
                 tweets = []
                 # Only process the most recent tweet
                 try:
-                    entry = feed.entries[0]
-                    tweet = {
-                        'id': self._extract_tweet_id(entry.link),
-                        'text': self._clean_text(entry.description),
-                        'created_at': email.utils.parsedate_to_datetime(entry.published),
-                        'public_metrics': self._extract_metrics(entry.description),
-                    }
-
-                    media = self._extract_media(entry.description)
-                    if media:
-                        tweet['attachments'] = {'media': media}
-
-                    tweets.append(tweet)
+                    tweets.append(self._parse_entry(feed.entries[0], username, feed))
                     logger.info(f"Successfully fetched latest tweet from @{username}")
                 except Exception as e:
                     logger.error(f"Error parsing tweet for @{username}: {str(e)}")
@@ -89,41 +117,133 @@ class TwitterClient:
                 logger.error(f"Error getting tweets for {username}: {str(e)}")
                 return []
 
-    async def _try_fetch_feed(self, username: str) -> Optional[feedparser.FeedParserDict]:
+    async def get_recent_tweets_batch(self, usernames: List[str]) -> Dict[str, List[Tweet]]:
+        """Get the most recent tweet of several users from one combined timeline.
+
+        Nitter serves the newest BATCH_FEED_SIZE entries across all users of
+        a `user1,user2/rss` feed. A user missing from a full page may still
+        have unseen tweets that were pushed off it, so such users are left
+        out of the result and the caller should fetch them individually.
+        """
+        usernames = [u.strip('@').strip() for u in usernames]
+        async with self.semaphore:  # Limit concurrent requests
+            try:
+                feed = await self._try_fetch_feed(','.join(usernames), batch=True)
+                if not feed:
+                    return {}
+
+                wanted = {u.lower(): u for u in usernames}
+                engagement = {}
+                for owner, tweet_id, counts in feed.get('engagement', ()):
+                    if owner.lower() in wanted:
+                        engagement.setdefault(owner.lower(), []).append((tweet_id, counts))
+                self._engagement.update(engagement)
+                results = {}
+                for entry in feed.entries:
+                    owner = wanted.get(self._entry_owner(entry).lower())
+                    if owner is None or owner in results:
+                        continue
+                    try:
+                        results[owner] = [self._parse_entry(entry, owner, feed)]
+                    except Exception as e:
+                        logger.error(f"Error parsing tweet for @{owner}: {str(e)}")
+
+                if len(feed.entries) < BATCH_FEED_SIZE:
+                    # Not a full page, so absent users have no tweets at all
+                    for username in usernames:
+                        results.setdefault(username, [])
+
+                logger.info(f"Fetched combined timeline for {len(usernames)} users, {len(results)} resolved")
+                return results
+            except Exception as e:
+                logger.error(f"Error getting combined timeline for {len(usernames)} users: {str(e)}")
+                return {}
+
+    async def _try_fetch_feed(self, username: str, batch: bool = False) -> Optional[feedparser.FeedParserDict]:
         """Try fetching feed from multiple Nitter instances with fallback"""
         username = username.strip('@').strip()
+        path = ','.join(quote(name) for name in username.split(','))
 
-        # Filter out failed instances and randomize the remaining ones
+        # Filter out failed instances; the rate limiter picks among the rest
         available_instances = [i for i in self.instances if i not in self._failed_instances]
         if not available_instances:
             # Reset failed instances if all have failed
             self._failed_instances.clear()
             available_instances = self.instances
 
-        instances = random.sample(available_instances, len(available_instances))
-
-        for base_url in instances:
+        tried = set()
+        while True:
+            candidates = [i for i in available_instances if i not in tried]
+            base_url = await self.rate_limiter.acquire(candidates)
+            if base_url is None:
+                break
+            tried.add(base_url)
             try:
-                url = f"{base_url}/{quote(username)}/rss"
+                url = f"{base_url}/{path}/rss"
                 session = await self._get_session()
 
-                async with session.get(url, ssl=False) as response:
+                cache_key = (base_url, username.lower())
+                cached = self._validators.get(cache_key)
+                headers = {}
+                if cached:
+                    self._validators.move_to_end(cache_key)
+                    etag, last_modified, _ = cached
+                    if etag:
+                        headers['If-None-Match'] = etag
+                    if last_modified:
+                        headers['If-Modified-Since'] = last_modified
+
+                started = time.perf_counter()
+                async with session.get(url, ssl=False, headers=headers) as response:
+                    metrics.FETCHES.inc(instance=base_url, status=response.status)
+                    if response.status == 429:
+                        # Back off from this instance only and try the next one
+                        self.rate_limiter.pause(base_url, parse_retry_after(response.headers.get('Retry-After')))
+                        continue
+                    if response.status == 304 and cached:
+                        # Feed unchanged since our last fetch from this instance
+                        metrics.FETCH_SECONDS.observe(time.perf_counter() - started, instance=base_url)
+                        feed = cached[2]
+                        feed['fetched_at'] = feed['parsed_at'] = time.time()
+                        return feed
                     if response.status == 200:
                         content = await response.text()
+                        fetched_at = time.time()
+                        metrics.FETCH_SECONDS.observe(time.perf_counter() - started, instance=base_url)
                         if not content or 'Error' in content:
                             logger.warning(f"Invalid content from {base_url}")
                             continue
-                        feed = feedparser.parse(content)
+                        with metrics.PARSE_SECONDS.time():
+                            feed = feedparser.parse(content)
+                        metrics.PARSES.inc()
                         if feed and feed.entries:
+                            feed['instance'] = base_url
+                            feed['fetched_at'] = fetched_at
+                            feed['parsed_at'] = time.time()
+                            # Before trimming: every entry's counts feed the engagement store
+                            feed['engagement'] = self._feed_engagement(feed.entries)
+                            etag = response.headers.get('ETag')
+                            last_modified = response.headers.get('Last-Modified')
+                            # Combined feeds are keyed by an ever-changing list of users, so only
+                            # single-user feeds are worth revalidating
+                            if (etag or last_modified) and not batch:
+                                # Only the newest entry is ever read back from a single-user feed
+                                feed['entries'] = feed.entries[:1]
+                                self._validators[cache_key] = (etag, last_modified, feed)
+                                self._validators.move_to_end(cache_key)
+                                if len(self._validators) > VALIDATOR_CACHE_SIZE:
+                                    self._validators.popitem(last=False)
                             # Successfully found working instance
                             if base_url in self._failed_instances:
                                 self._failed_instances.remove(base_url)
                             return feed
             except asyncio.TimeoutError:
+                metrics.FETCHES.inc(instance=base_url, status='timeout')
                 logger.warning(f"Timeout on {base_url} for @{username}")
                 self._failed_instances.add(base_url)
                 continue
             except Exception as e:
+                metrics.FETCHES.inc(instance=base_url, status='error')
                 logger.warning(f"Error on {base_url} for @{username}: {str(e)}")
                 self._failed_instances.add(base_url)
                 continue
@@ -131,6 +251,77 @@ class TwitterClient:
         logger.error(f"All instances failed for @{username}")
         return None
 
+    def profile_for(self, username: str) -> Profile:
+        """Profile of a user from feeds already fetched, without another request.
+
+        Users only ever seen in combined timelines get a minimal profile
+        until their own feed is fetched.
+        """
+        username = username.strip('@').strip()
+        profile = self._profiles.get(username.lower())
+        if profile is not None:
+            self._profiles.move_to_end(username.lower())
+            return profile
+        return Profile(username=username, name=username, id=username)
+
+    def pop_engagement(self, username: str) -> List[Tuple[str, Metrics]]:
+        """(tweet_id, Metrics) of every entry in the feed last polled for a user, handed out once"""
+        return self._engagement.pop(username.strip('@').strip().lower(), [])
+
+    def _feed_engagement(self, entries) -> List[Tuple[str, str, Metrics]]:
+        """(owner, tweet_id, Metrics) of every entry, without parsing whole tweets"""
+        engagement = []
+        for entry in entries:
+            tweet_id = self._extract_tweet_id(entry.get('link', ''))
+            if tweet_id != "0":
+                engagement.append((self._entry_owner(entry), tweet_id, self._extract_metrics(entry.get('description', ''))))
+        return engagement
+
+    def _parse_profile(self, feed, username: str) -> Profile:
+        """Build a Profile record from a Nitter RSS feed header and remember it"""
+        name = feed.feed.title.split("'")[0].strip()
+        profile = Profile(
+            username=username.strip('@'),
+            name=name,
+            id=username.strip('@'),
+            profile_image_url=feed.feed.image.href if hasattr(feed.feed, 'image') else None
+        )
+        key = profile.username.lower()
+        self._profiles[key] = profile
+        self._profiles.move_to_end(key)
+        if len(self._profiles) > PROFILE_CACHE_SIZE:
+            self._profiles.popitem(last=False)
+        return profile
+
+    def _entry_owner(self, entry) -> str:
+        """Whose timeline an entry belongs to, crediting retweets to the retweeter"""
+        title = entry.get('title', '')
+        match = re.match(r'RT by @(\w+):', title)
+        if match:
+            return match.group(1)
+        return entry.get('author', '').lstrip('@')
+
+    def _parse_entry(self, entry, username: str, feed=None) -> Tweet:
+        """Build a Tweet record from a Nitter RSS entry"""
+        username = username.strip('@').strip()
+        title = entry.get('title', '')
+        # Nitter credits the original author in dc:creator and prefixes
+        # the title with "RT by @user:" for retweets and "R to @user:" for replies
+        author = entry.get('author', '').lstrip('@') or username
+        return Tweet(
+            id=self._extract_tweet_id(entry.link),
+            text=self._clean_text(entry.description),
+            created_at=email.utils.parsedate_to_datetime(entry.published),
+            metrics=self._extract_metrics(entry.description),
+            author=author,
+            media=tuple(self._extract_media(entry.description)),
+            is_retweet=title.startswith('RT by @') or author.lower() != username.lower(),
+            is_reply=title.startswith('R to @'),
+            instance=feed.get('instance', '') if feed else '',
+            fetched_at=feed.get('fetched_at', 0.0) if feed else 0.0,
+            parsed_at=feed.get('parsed_at', 0.0) if feed else 0.0,
+        )
+
     def _extract_tweet_id(self, url: str) -> str:
         """Extract tweet ID from URL"""
         try:
@@ -150,7 +341,7 @@ class TwitterClient:
         except:
             return ""
 
-    def _extract_media(self, html: str) -> List[Dict]:
+    def _extract_media(self, html: str) -> List[Media]:
         """Extract media URLs from tweet HTML"""
         try:
             media = []
@@ -158,23 +349,24 @@ class TwitterClient:
             for match in img_matches:
                 url = match.group(1)
                 if 'tweet_video_thumb' not in url and 'emoji' not in url:
-                    media.append({'url': url, 'type': 'photo'})
+                    media.append(Media(url=url, type='photo'))
             return media
         except:
             return []
 
-    def _extract_metrics(self, html: str) -> Dict[str, int]:
+    def _extract_metrics(self, html: str) -> Metrics:
         """Extract engagement metrics from tweet HTML"""
-        metrics = {'reply_count': 0, 'retweet_count': 0, 'like_count': 0}
         try:
             metrics_match = re.search(r'(\d+) replies?, (\d+) retweets?, (\d+) likes?', html)
             if metrics_match:
-                metrics['reply_count'] = int(metrics_match.group(1))
-                metrics['retweet_count'] = int(metrics_match.group(2))
-                metrics['like_count'] = int(metrics_match.group(3))
+                return Metrics(
+                    reply_count=int(metrics_match.group(1)),
+                    retweet_count=int(metrics_match.group(2)),
+                    like_count=int(metrics_match.group(3))
+                )
         except:
             pass
-        return metrics
+        return Metrics()
 
     async def close(self):
         """Close the aiohttp session"""
@@ -1,44 +1,113 @@
 import discord
-from config import COLORS
+from collections import OrderedDict
+import metrics
+from media_cache import proxy_url
+from config import COLORS, RENDER_CACHE_SIZE
 
-def create_tweet_embed(tweet, user):
-    """Create a Discord embed for a tweet"""
+class RenderCache:
+    """Size-bounded LRU cache of rendered tweets"""
+
+    def __init__(self, maxsize=RENDER_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            metrics.RENDER_CACHE.inc(result='miss')
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        metrics.RENDER_CACHE.inc(result='hit')
+        return entry
+
+    def put(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        return entry
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+# Shared by every channel and renderer in this process
+render_cache = RenderCache()
+
+def render_tweet(tweet, user):
+    """Do the formatting work for a tweet once per tracked handle.
+
+    The result is cached so fanning a tweet out to many channels reuses
+    it. The key includes the profile and retweet flag because both depend
+    on which handle the tweet was fetched for: the same tweet id can
+    arrive as an original from one handle and a retweet from another.
+    """
+    tweet_id = str(tweet.id)
+    key = (tweet_id, user, tweet.is_retweet)
+    entry = render_cache.get(key)
+    if entry is not None:
+        return entry
 
     # Determine tweet type and color
-    if hasattr(tweet, 'referenced_tweets') and tweet.get('referenced_tweets') and any(t.type == 'retweeted' for t in tweet['referenced_tweets']):
+    if tweet.is_retweet:
         color = COLORS['retweet']
-    elif 'attachments' in tweet and tweet['attachments']:
+    elif tweet.media:
         color = COLORS['media']
     else:
         color = COLORS['text']
 
+    image_url = None
+    if tweet.media and tweet.media[0].type == 'photo':
+        image_url = proxy_url(tweet.media[0].url)
+
+    entry = {
+        'text': tweet.text,
+        'color': color,
+        'created_at': tweet.created_at,
+        'author': f"{user.name} (@{user.username})",
+        'url': f"https://twitter.com/{tweet.author or user.username}/status/{tweet_id}",
+        'icon_url': user.profile_image_url or None,
+        'stats': f"💬 {tweet.metrics.reply_count} "
+                 f"🔄 {tweet.metrics.retweet_count} "
+                 f"❤️ {tweet.metrics.like_count}",
+        'image_url': image_url,
+    }
+    return render_cache.put(key, entry)
+
+def create_tweet_embed(tweet, user):
+    """Create a Discord embed for a tweet"""
+    rendered = render_tweet(tweet, user)
+    embed = rendered.get('discord')
+    if embed is not None:
+        return embed
+
     embed = discord.Embed(
-        description=tweet['text'],
-        color=color,
-        timestamp=tweet['created_at']
+        description=rendered['text'],
+        color=rendered['color'],
+        timestamp=rendered['created_at']
     )
 
     # Set author information
     embed.set_author(
-        name=f"{user['name']} (@{user['username']})",
-        url=f"https://twitter.com/{user['username']}/status/{tweet['id']}",
-        icon_url=user['profile_image_url'] if user['profile_image_url'] else None
+        name=rendered['author'],
+        url=rendered['url'],
+        icon_url=rendered['icon_url']
     )
 
     # Add metrics
-    embed.add_field(
-        name="Stats",
-        value=f"💬 {tweet['public_metrics']['reply_count']} "
-              f"🔄 {tweet['public_metrics']['retweet_count']} "
-              f"❤️ {tweet['public_metrics']['like_count']}"
-    )
+    embed.add_field(name="Stats", value=rendered['stats'])
 
     # Add media if present
-    if 'attachments' in tweet and 'media' in tweet['attachments']:
-        first_media = tweet['attachments']['media'][0]
-        if first_media['type'] == 'photo':
-            embed.set_image(url=first_media['url'])
+    if rendered['image_url']:
+        embed.set_image(url=rendered['image_url'])
 
+    rendered['discord'] = embed
     return embed
 
 def format_error_message(error):
@@ -47,4 +116,4 @@ def format_error_message(error):
         title="Error",
         description=str(error),
         color=discord.Color.red()
-    )
\ No newline at end of file
+    )